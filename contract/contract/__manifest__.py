@@ -11,7 +11,7 @@
 
 {
     "name": "Recurring - Contracts Management",
-    "version": "18.0.2.0.6",
+    "version": "18.0.2.2.0",
     "category": "Contract Management",
     "license": "AGPL-3",
     "author": "Tecnativa, ACSONE SA/NV, Odoo Community Association (OCA)",
@@ -31,6 +31,7 @@
         "data/ir_ui_menu.xml",
         "wizards/contract_manually_create_invoice.xml",
         "views/contract_tag.xml",
+        "views/contract_invoicing_run.xml",
         "views/contract_template.xml",
         "views/contract_template_line.xml",
         "views/contract.xml",
@@ -14,7 +14,7 @@ class PortalContract(CustomerPortal):
         values = super()._prepare_home_portal_values(counters)
         if "contract_count" in counters:
             contract_model = request.env["contract.contract"]
-            contract_count = contract_model.search_count([])
+            contract_count = contract_model._portal_search_count([])
             values["contract_count"] = contract_count
         return values
 
@@ -35,6 +35,7 @@ class PortalContract(CustomerPortal):
         type="http",
         auth="user",
         website=True,
+        readonly=True,
     )
     def portal_my_contracts(
         self, page=1, date_begin=None, date_end=None, sortby=None, **kw
@@ -52,7 +53,7 @@ class PortalContract(CustomerPortal):
             sortby = "date"
         order = searchbar_sortings[sortby]["order"]
         # count for pager
-        contract_count = contract_obj.search_count(domain)
+        contract_count = contract_obj._portal_search_count(domain)
         # pager
         pager = portal_pager(
             url="/my/contracts",
@@ -88,13 +89,28 @@ class PortalContract(CustomerPortal):
         type="http",
         auth="public",
         website=True,
+        readonly=True,
     )
-    def portal_my_contract_detail(self, contract_contract_id, access_token=None, **kw):
+    def portal_my_contract_detail(
+        self,
+        contract_contract_id,
+        access_token=None,
+        report_type=None,
+        download=False,
+        **kw,
+    ):
         try:
             contract_sudo = self._document_check_access(
                 "contract.contract", contract_contract_id, access_token
             )
         except (AccessError, MissingError):
             return request.redirect("/my")
+        if report_type in ("html", "pdf", "text"):
+            return self._show_report(
+                model=contract_sudo,
+                report_type=report_type,
+                report_ref="contract.report_contract",
+                download=download,
+            )
         values = self._contract_get_page_view_values(contract_sudo, access_token, **kw)
         return request.render("contract.portal_contract_page", values)
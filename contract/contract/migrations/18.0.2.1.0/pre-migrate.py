@@ -0,0 +1,8 @@
+# Copyright 2026 ACSONE SA/NV
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+
+
+def migrate(cr, version):
+    # The index on contract_line_id becomes partial (btree_not_null), the
+    # full one has to be dropped for the ORM to create it again.
+    cr.execute("DROP INDEX IF EXISTS account_move_line__contract_line_id_index")
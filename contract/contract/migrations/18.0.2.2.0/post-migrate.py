@@ -0,0 +1,11 @@
+# Copyright 2026 ACSONE SA/NV
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+
+
+def migrate(cr, version):
+    # The portal pages are rendered on read-only cursors: the contracts need
+    # their access token beforehand.
+    cr.execute(
+        "UPDATE contract_contract SET access_token = gen_random_uuid()::varchar "
+        "WHERE access_token IS NULL"
+    )
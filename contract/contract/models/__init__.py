@@ -10,3 +10,6 @@ from . import account_move
 from . import account_move_line
 from . import res_partner
 from . import contract_tag
+from . import contract_invoicing_run
+from . import res_company
+from . import res_config_settings
@@ -10,5 +10,5 @@ class AccountMoveLine(models.Model):
     _inherit = "account.move.line"
 
     contract_line_id = fields.Many2one(
-        "contract.line", string="Contract Line", index=True
+        "contract.line", string="Contract Line", index="btree_not_null"
     )
@@ -7,16 +7,33 @@
 # Copyright 2021 Tecnativa - Víctor Martínez
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
 
+import json
 import logging
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
 
 from markupsafe import Markup
+from psycopg2.errors import SerializationFailure
 
 from odoo import Command, api, fields, models
 from odoo.exceptions import ValidationError
 from odoo.osv import expression
+from odoo.tools import SQL, create_index, groupby, split_every
+from odoo.tools.lru import LRU
+from odoo.tools.misc import str2bool
 
 _logger = logging.getLogger(__name__)
 
+# Contract counters of the portal users, by database, generation, user,
+# companies and domain: {key: (expiration time, count)}. Bumping the
+# generation of a database drops all its counters.
+_portal_count_cache = LRU(4096)
+_portal_count_generation = defaultdict(int)
+
+DEFAULT_CRON_SHARD_BATCH_SIZE = 100
+
 
 class ContractContract(models.Model):
     _name = "contract.contract"
@@ -123,6 +140,16 @@ class ContractContract(models.Model):
     # === Dates ===
     date_end = fields.Date(compute="_compute_date_end", store=True, readonly=False)
 
+    def init(self):
+        # Serves the domain of the recurring documents cron
+        create_index(
+            self.env.cr,
+            "contract_contract_recurring_create_index",
+            self._table,
+            ["generation_type", "recurring_next_date", "company_id"],
+            where="active",
+        )
+
     # === Compute Methods ===
 
     def _compute_access_url(self):
@@ -154,8 +181,11 @@ class ContractContract(models.Model):
                 rec.manual_currency_id = False
 
     def _compute_invoice_count(self):
+        invoices_map = self._get_related_invoices_map()
         for rec in self:
-            rec.invoice_count = len(rec._get_related_invoices())
+            rec.invoice_count = len(
+                invoices_map.get(rec._origin.id, self.env["account.move"])
+            )
 
     @api.depends(
         "next_period_date_start",
@@ -168,14 +198,19 @@ class ContractContract(models.Model):
         "contract_line_ids.is_canceled",
     )
     def _compute_recurring_next_date(self):
+        min_dates = self.filtered("id")._get_lines_recurring_next_date_map()
         for contract in self:
-            recurring_next_date = contract.contract_line_ids.filtered(
-                lambda line: (
-                    line.recurring_next_date
-                    and not line.is_canceled
-                    and (not line.display_type or line.is_recurring_note)
-                )
-            ).mapped("recurring_next_date")
+            if contract.id:
+                recurring_next_date = min_dates.get(contract.id)
+            else:
+                recurring_next_date = contract.contract_line_ids.filtered(
+                    lambda line: (
+                        line.recurring_next_date
+                        and not line.is_canceled
+                        and (not line.display_type or line.is_recurring_note)
+                    )
+                ).mapped("recurring_next_date")
+                recurring_next_date = recurring_next_date and min(recurring_next_date)
             # we give priority to computation from date_start if modified
             if (
                 contract._origin
@@ -191,7 +226,37 @@ class ContractContract(models.Model):
                     max_date_end=contract.date_end,
                 )
             else:
-                contract.recurring_next_date = min(recurring_next_date)
+                contract.recurring_next_date = recurring_next_date
+
+    def _get_lines_recurring_next_date_map(self):
+        """Return the earliest next invoice date of the invoiceable lines of
+        the contracts in self, in one grouped query.
+
+        :return: dictionary {contract id: date}, without the contracts having
+            no such line
+        """
+        if not self:
+            return {}
+        # Like contract_line_ids, include the lines of archived contracts
+        rows = (
+            self.env["contract.line"]
+            .with_context(active_test=False)
+            ._read_group(
+                [
+                    ("contract_id", "in", self.ids),
+                    ("recurring_next_date", "!=", False),
+                    ("is_canceled", "=", False),
+                    "|",
+                    ("display_type", "=", False),
+                    "&",
+                    ("display_type", "=", "line_note"),
+                    ("note_invoicing_mode", "=", "custom"),
+                ],
+                groupby=["contract_id"],
+                aggregates=["recurring_next_date:min"],
+            )
+        )
+        return {contract.id: date for contract, date in rows}
 
     @api.depends("contract_line_ids.create_invoice_visibility")
     def _compute_create_invoice_visibility(self):
@@ -269,8 +334,14 @@ class ContractContract(models.Model):
     # === CRUD ===
     @api.model_create_multi
     def create(self, vals_list):
+        for vals in vals_list:
+            # The portal pages are rendered on read-only cursors and can't
+            # generate the tokens of their links
+            if not vals.get("access_token"):
+                vals["access_token"] = str(uuid.uuid4())
         records = super().create(vals_list)
         records._set_start_contract_modification()
+        self._clear_portal_count_cache()
         return records
 
     def write(self, vals):
@@ -281,8 +352,83 @@ class ContractContract(models.Model):
             self._modification_mail_send()
         else:
             res = super().write(vals)
+        self._clear_portal_count_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self._clear_portal_count_cache()
         return res
 
+    def message_subscribe(self, partner_ids=None, subtype_ids=None):
+        res = super().message_subscribe(
+            partner_ids=partner_ids, subtype_ids=subtype_ids
+        )
+        self._clear_portal_count_cache()
+        return res
+
+    def message_unsubscribe(self, partner_ids=None):
+        res = super().message_unsubscribe(partner_ids=partner_ids)
+        self._clear_portal_count_cache()
+        return res
+
+    # === Portal counters ===
+
+    @api.model
+    def _get_portal_count_ttl(self):
+        """Number of seconds the portal contract counters are cached for a
+        user, 0 to disable the cache.
+        """
+        return int(
+            self.env["ir.config_parameter"]
+            .sudo()
+            .get_param("contract.portal.counter_ttl", 60)
+        )
+
+    @api.model
+    def _portal_search_count(self, domain):
+        """Return ``search_count(domain)``, cached per user and companies
+        for ``contract.portal.counter_ttl`` seconds. The counters of the
+        database are dropped whenever a contract or its followers change.
+        """
+        ttl = self._get_portal_count_ttl()
+        if not ttl:
+            return self.search_count(domain)
+        dbname = self.env.cr.dbname
+        key = (
+            dbname,
+            _portal_count_generation[dbname],
+            self.env.uid,
+            tuple(self.env.companies.ids),
+            repr(domain),
+        )
+        now = time.monotonic()
+        cached = _portal_count_cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+        count = self.search_count(domain)
+        _portal_count_cache[key] = (now + ttl, count)
+        return count
+
+    @api.model
+    def _clear_portal_count_cache(self):
+        _portal_count_generation[self.env.cr.dbname] += 1
+
+    def _get_portal_url_readonly(self, report_type=None, download=None):
+        """Same as ``get_portal_url()`` for the read-only portal pages, which
+        can't generate a missing access token: without one, the link relies
+        on the access rights of the portal user.
+        """
+        self.ensure_one()
+        if self.access_token:
+            return self.get_portal_url(report_type=report_type, download=download)
+        params = []
+        if report_type:
+            params.append(f"report_type={report_type}")
+        if download:
+            params.append("download=true")
+        return self.access_url + ("?" + "&".join(params) if params else "")
+
     # === Actions ===
 
     def action_preview(self):
@@ -407,24 +553,40 @@ class ContractContract(models.Model):
 
     def _get_related_invoices(self):
         self.ensure_one()
-
-        invoices = (
-            self.env["account.move.line"]
-            .search(
-                [
-                    (
-                        "contract_line_id",
-                        "in",
-                        self.contract_line_ids.ids,
-                    )
-                ]
-            )
-            .mapped("move_id")
+        return self._get_related_invoices_map().get(
+            self._origin.id, self.env["account.move"]
         )
+
+    def _get_related_invoices_map(self):
+        """Return the invoices of every contract of the recordset.
+
+        The mapping is resolved with a constant number of grouped queries,
+        whatever the number of contracts.
+
+        :return: dict {contract id: account.move recordset}
+        """
+        contracts = self._origin
+        invoices_map = {
+            contract_id: self.env["account.move"] for contract_id in contracts.ids
+        }
+        lines = contracts.contract_line_ids
+        if lines:
+            for contract_line, moves in self.env["account.move.line"]._read_group(
+                [("contract_line_id", "in", lines.ids)],
+                groupby=["contract_line_id"],
+                aggregates=["move_id:recordset"],
+            ):
+                invoices_map[contract_line.contract_id.id] |= moves
         # we are forced to always search for this for not losing possible <=v11
         # generated invoices
-        invoices |= self.env["account.move"].search([("old_contract_id", "=", self.id)])
-        return invoices
+        if contracts:
+            for contract, moves in self.env["account.move"]._read_group(
+                [("old_contract_id", "in", contracts.ids)],
+                groupby=["old_contract_id"],
+                aggregates=["id:recordset"],
+            ):
+                invoices_map[contract.id] |= moves
+        return invoices_map
 
     def _get_computed_currency(self):
         """Helper method for returning the theoretical computed currency."""
@@ -444,15 +606,27 @@ class ContractContract(models.Model):
         self.ensure_one()
         new_lines = self.env["contract.line"]
         contract_line_model = self.env["contract.line"]
-        for contract_line in contract.contract_line_ids:
-            vals = contract_line._convert_to_write(contract_line.read()[0])
-            # Remove template link field
-            vals.pop("contract_template_id", False)
-            vals["date_start"] = fields.Date.context_today(contract_line)
-            vals["recurring_next_date"] = fields.Date.context_today(contract_line)
+        for vals in contract._prepare_contract_line_values(
+            fields.Date.context_today(self)
+        ):
             new_lines += contract_line_model.new(vals)
         return new_lines
 
+    def _get_invoice_resolution(self, key, resolver):
+        """Return the value computed by ``resolver`` for ``key``.
+
+        When called during an invoicing run, the value is memoized in the
+        ``contract_invoice_resolution`` context dict shared by all the
+        contracts of the run, so that lookups depending only on the company,
+        the partner or the contract type are done once per key.
+        """
+        memo = self.env.context.get("contract_invoice_resolution")
+        if memo is None:
+            return resolver()
+        if key not in memo:
+            memo[key] = resolver()
+        return memo[key]
+
     def _prepare_invoice(self, date_invoice, journal=None):
         """Prepare the values for the generated invoice record.
 
@@ -463,12 +637,15 @@ class ContractContract(models.Model):
             journal = (
                 self.journal_id
                 if self.journal_id.type == self.contract_type
-                else self.env["account.journal"].search(
-                    [
-                        ("type", "=", self.contract_type),
-                        ("company_id", "=", self.company_id.id),
-                    ],
-                    limit=1,
+                else self._get_invoice_resolution(
+                    ("journal", self.company_id.id, self.contract_type),
+                    lambda: self.env["account.journal"].search(
+                        [
+                            ("type", "=", self.contract_type),
+                            ("company_id", "=", self.company_id.id),
+                        ],
+                        limit=1,
+                    ),
                 )
             )
         if not journal:
@@ -538,38 +715,73 @@ class ContractContract(models.Model):
         :return: contract lines (contract.line recordset)
         """
         self.ensure_one()
+        return self._get_lines_to_invoice_map(date_ref)[self.id]
 
-        def can_be_invoiced(contract_line):
-            return (
-                not contract_line.is_canceled
-                and contract_line.recurring_next_date
-                and contract_line.recurring_next_date <= date_ref
-                and contract_line.next_period_date_start
-            )
-
-        lines2invoice = previous = self.env["contract.line"]
-        current_section = current_note = False
-        for line in self.contract_line_ids:
-            if line.display_type == "line_section":
-                current_section = line
-            elif line.display_type == "line_note" and not line.is_recurring_note:
-                if line.note_invoicing_mode == "with_previous_line":
-                    if previous in lines2invoice:
-                        lines2invoice |= line
-                    current_note = False
-                elif line.note_invoicing_mode == "with_next_line":
-                    current_note = line
-            elif line.is_recurring_note or not line.display_type:
-                if can_be_invoiced(line):
-                    if current_section:
-                        lines2invoice |= current_section
-                        current_section = False
-                    if current_note:
-                        lines2invoice |= current_note
-                    lines2invoice |= line
-                    current_note = False
-            previous = line
-        return lines2invoice.sorted()
+    def _get_lines_to_invoice_map(self, date_ref):
+        """
+        Batch version of ``_get_lines_to_invoice``: select the lines to
+        invoice of all the contracts in self in one pass over their lines.
+        :param date_ref: date used as reference date to find lines to invoice
+        :return: dictionary {contract id: contract lines to invoice}
+        """
+        fnames = [
+            "display_type",
+            "is_recurring_note",
+            "note_invoicing_mode",
+            "is_canceled",
+            "recurring_next_date",
+            "next_period_date_start",
+        ]
+        lines = self.contract_line_ids
+        lines.fetch([fname for fname in fnames if lines._fields[fname].store])
+        # Periods forced when invoicing a catch-up period: the other lines
+        # are not due
+        periods = self.env.context.get("contract_invoice_periods")
+        lines_map = {}
+        for contract in self:
+            line_ids = []
+            selected = set()
+            previous_id = False
+            current_section_id = current_note_id = False
+            for line in contract.contract_line_ids:
+                (
+                    display_type,
+                    is_recurring_note,
+                    note_invoicing_mode,
+                    is_canceled,
+                    recurring_next_date,
+                    next_period_date_start,
+                ) = (line[fname] for fname in fnames)
+                if periods is not None:
+                    period = periods.get(line.id) or (False, False, False)
+                    next_period_date_start, recurring_next_date = period[0], period[2]
+                if display_type == "line_section":
+                    current_section_id = line.id
+                elif display_type == "line_note" and not is_recurring_note:
+                    if note_invoicing_mode == "with_previous_line":
+                        if previous_id in selected:
+                            line_ids.append(line.id)
+                            selected.add(line.id)
+                        current_note_id = False
+                    elif note_invoicing_mode == "with_next_line":
+                        current_note_id = line.id
+                elif is_recurring_note or not display_type:
+                    if (
+                        not is_canceled
+                        and recurring_next_date
+                        and recurring_next_date <= date_ref
+                        and next_period_date_start
+                    ):
+                        for line_id in (current_section_id, current_note_id):
+                            if line_id:
+                                line_ids.append(line_id)
+                                selected.add(line_id)
+                        line_ids.append(line.id)
+                        selected.add(line.id)
+                        current_section_id = current_note_id = False
+                previous_id = line.id
+            lines_map[contract.id] = self.env["contract.line"].browse(line_ids)
+        return lines_map
 
     def _prepare_recurring_invoices_values(self, date_ref=False):
         """
@@ -579,14 +791,25 @@ class ContractContract(models.Model):
         :return: list of dictionaries (invoices values)
         """
         invoices_values = []
-        for contract in self:
+        lines_invoiced_ids = []
+        contracts = self
+        if "contract_invoice_resolution" not in self.env.context:
+            contracts = self.with_context(contract_invoice_resolution={})
+        lines_map = {}
+        for contract in contracts:
             if not date_ref:
                 date_ref = contract.recurring_next_date
             if not date_ref:
                 # this use case is possible when recurring_create_invoice is
                 # called for a finished contract
                 continue
-            contract_lines = contract._get_lines_to_invoice(date_ref)
+            if contract.id not in lines_map:
+                lines_map = contracts._get_lines_to_invoice_map(date_ref)
+                lines = contracts.env["contract.line"].concat(*lines_map.values())
+                lines._memoize_period_names(
+                    [line._get_invoice_period()[:2] for line in lines]
+                )
+            contract_lines = lines_map[contract.id]
             if not contract_lines:
                 continue
             invoice_vals = contract._prepare_invoice(date_ref)
@@ -604,42 +827,221 @@ class ContractContract(models.Model):
                         Command.create(invoice_line_vals)
                     )
             invoices_values.append(invoice_vals)
-            # Force the recomputation of journal items
-            contract_lines._update_last_date_invoiced()
+            lines_invoiced_ids += contract_lines.ids
+        # Force the recomputation of journal items, in one grouped update for
+        # all the contracts (unless simulating the invoicing, or invoicing a
+        # catch-up period, see _prepare_catchup_invoices_values)
+        if (
+            not self.env.context.get("contract_simulation")
+            and "contract_invoice_periods" not in self.env.context
+        ):
+            self.env["contract.line"].browse(
+                lines_invoiced_ids
+            )._update_last_date_invoiced()
         return invoices_values
 
+    def _prepare_catchup_invoices_values(
+        self, date_ref, consolidated=False, max_periods=12
+    ):
+        """Build the values of the invoices of all the periods due at
+        ``date_ref`` for the contracts in self, up to ``max_periods`` periods
+        per contract, instead of only the next one.
+
+        The periods of the lines are computed once with the recurrence
+        engine, then every period is prepared like a regular run, with the
+        periods given in the ``contract_invoice_periods`` context dict. The
+        invoiced dates of the lines are only moved once, to the end of their
+        last invoiced period.
+        :param consolidated: merge the periods of a contract in one invoice
+            instead of one invoice per period
+        :return: list of dictionaries (invoices values)
+        """
+        contracts = self
+        if "contract_invoice_resolution" not in self.env.context:
+            contracts = self.with_context(contract_invoice_resolution={})
+        lines = contracts.contract_line_ids
+        periods_by_line = lines._get_catchup_periods(date_ref, max_periods)
+        contract_by_line = {line.id: line.contract_id.id for line in lines}
+        last_dates_invoiced = {}
+        invoices_values = []
+        consolidated_values = {}
+        for rank in range(max(max_periods, 1)):
+            periods = {
+                line_id: line_periods[rank]
+                for line_id, line_periods in periods_by_line.items()
+                if rank < len(line_periods)
+            }
+            if not periods:
+                break
+            catchup = contracts.with_context(contract_invoice_periods=periods)
+            for contract_lines in catchup._get_lines_to_invoice_map(date_ref).values():
+                for line_id in contract_lines.ids:
+                    if line_id in periods:
+                        last_dates_invoiced[line_id] = periods[line_id][1]
+            for values in catchup._prepare_recurring_invoices_values(date_ref):
+                line_commands = values["invoice_line_ids"]
+                if not consolidated or not line_commands:
+                    invoices_values.append(values)
+                    continue
+                line_id = line_commands[0][2]["contract_line_id"]
+                contract_id = contract_by_line[line_id]
+                if contract_id in consolidated_values:
+                    contract_values = consolidated_values[contract_id]
+                    contract_values["invoice_line_ids"] += line_commands
+                else:
+                    consolidated_values[contract_id] = values
+                    invoices_values.append(values)
+        if not self.env.context.get("contract_simulation"):
+            for last_date_invoiced, line_ids in groupby(
+                last_dates_invoiced, key=last_dates_invoiced.get
+            ):
+                lines.browse(line_ids).write({"last_date_invoiced": last_date_invoiced})
+        return invoices_values
+
+    @contextmanager
+    def _profile_stage(self, stages, name):
+        """Measure the duration and the SQL queries of a stage, recorded in
+        ``stages[name]``. The block may set ``records`` on the yielded
+        dictionary. Nothing is measured when ``stages`` is None.
+        """
+        stage = {"records": 0}
+        if stages is None:
+            yield stage
+            return
+        start = time.perf_counter()
+        queries = self.env.cr.sql_log_count
+        yield stage
+        self.env.flush_all()
+        stage["duration"] = time.perf_counter() - start
+        stage["queries"] = self.env.cr.sql_log_count - queries
+        stages[name] = stage
+
+    @api.model
+    def _is_invoicing_instrumented(self):
+        return str2bool(
+            self.env["ir.config_parameter"]
+            .sudo()
+            .get_param("contract.invoicing.instrumentation", "False")
+        )
+
+    def _record_invoicing_stages(self, stages):
+        """Log the stages of the invoicing of the contracts in self and, when
+        running inside an instrumented cron run, persist them on it.
+        """
+        run = self.env["contract.invoicing.run"]
+        run_id = self.env.context.get("contract_invoicing_run_id")
+        batch = 0
+        if run_id:
+            run = run.sudo().browse(run_id)
+            batch = run.batch_count + 1
+            run.batch_count = batch
+        for name, stage in stages.items():
+            _logger.info(
+                "Contract invoicing stage: %s",
+                json.dumps(
+                    {
+                        "run": run.id or None,
+                        "company": self.env.company.id,
+                        "batch": batch,
+                        "stage": name,
+                        "contracts": len(self),
+                        "duration": round(stage["duration"], 6),
+                        "queries": stage["queries"],
+                        "records": stage["records"],
+                    }
+                ),
+            )
+        if run:
+            run.stage_ids = [
+                Command.create(
+                    {
+                        "company_id": self.env.company.id,
+                        "batch": batch,
+                        "name": name,
+                        "duration": stage["duration"],
+                        "query_count": stage["queries"],
+                        "record_count": stage["records"],
+                    }
+                )
+                for name, stage in stages.items()
+            ]
+
     @api.model
     def _invoice_followers(self, invoices):
+        """Subscribe the followers of the contracts in self with the invoice
+        created subtype to their new ``invoices``. The invoices sharing the
+        same followers are subscribed together.
+        """
         invoice_create_subtype = self.env.ref(
             "contract.mail_message_subtype_invoice_created"
         )
+        followers = self.env["mail.followers"].search(
+            [
+                ("res_model", "=", self._name),
+                ("res_id", "in", self.ids),
+                ("subtype_ids", "in", invoice_create_subtype.ids),
+            ]
+        )
+        partners_by_contract = defaultdict(set)
+        for follower in followers:
+            partners_by_contract[follower.res_id].add(follower.partner_id.id)
+        invoices_map = self._get_related_invoices_map()
+        invoice_ids_by_partners = defaultdict(list)
         for item in self:
-            partner_ids = item.message_follower_ids.filtered(
-                lambda x: invoice_create_subtype in x.subtype_ids
-            ).mapped("partner_id")
+            partner_ids = partners_by_contract.get(item.id)
             if partner_ids:
-                (invoices & item._get_related_invoices()).message_subscribe(
-                    partner_ids=partner_ids.ids
-                )
+                invoice_ids_by_partners[frozenset(partner_ids)] += (
+                    invoices & invoices_map[item.id]
+                ).ids
+        for partner_ids, invoice_ids in invoice_ids_by_partners.items():
+            invoices.browse(invoice_ids).message_subscribe(
+                partner_ids=sorted(partner_ids)
+            )
 
     @api.model
     def _add_contract_origin(self, invoices):
+        """Log the creation message of the ``invoices`` generated from the
+        contracts in self, all at once.
+        """
+        invoices_map = self._get_related_invoices_map()
+        translation = self.env._("by contract")
+        bodies = {}
         for item in self:
-            for move in invoices & item._get_related_invoices():
-                translation = self.env._("by contract")
-                move.message_post(
-                    body=Markup(
-                        f"{move._creation_message()} {translation} "
-                        f"{item._get_html_link(title=item.display_name)}."
-                    )
+            link = item._get_html_link(title=item.display_name)
+            for move in invoices & invoices_map[item.id]:
+                bodies[move.id] = Markup(
+                    f"{move._creation_message()} {translation} {link}."
                 )
+        if bodies:
+            invoices.browse(list(bodies))._message_log_batch(bodies=bodies)
 
     def _recurring_create_invoice(self, date_ref=False):
-        invoices_values = self._prepare_recurring_invoices_values(date_ref)
-        moves = self.env["account.move"].create(invoices_values)
-        self._add_contract_origin(moves)
-        self._invoice_followers(moves)
-        self._compute_recurring_next_date()
+        stages = {} if self._is_invoicing_instrumented() else None
+        catchup_mode = date_ref and self.env.company.contract_catchup_mode
+        with self._profile_stage(stages, "prepare") as stage:
+            if catchup_mode in ("per_period", "consolidated"):
+                invoices_values = self._prepare_catchup_invoices_values(
+                    date_ref,
+                    consolidated=catchup_mode == "consolidated",
+                    max_periods=self.env.company.contract_catchup_max_periods,
+                )
+            else:
+                invoices_values = self._prepare_recurring_invoices_values(date_ref)
+            stage["records"] = len(invoices_values)
+        with self._profile_stage(stages, "create") as stage:
+            moves = self.env["account.move"].create(invoices_values)
+            stage["records"] = len(moves)
+        with self._profile_stage(stages, "add_contract_origin") as stage:
+            self._add_contract_origin(moves)
+            stage["records"] = len(moves)
+        with self._profile_stage(stages, "invoice_followers") as stage:
+            self._invoice_followers(moves)
+            stage["records"] = len(moves)
+        with self._profile_stage(stages, "compute_recurring_next_date") as stage:
+            self._compute_recurring_next_date()
+            stage["records"] = len(self)
+        if stages is not None:
+            self._record_invoicing_stages(stages)
         return moves
 
     @api.model
@@ -652,14 +1054,17 @@ class ContractContract(models.Model):
             return self.__class__._recurring_create_invoice
 
     @api.model
-    def _cron_recurring_create(self, date_ref=False, create_type="invoice"):
+    def _cron_recurring_create(
+        self, date_ref=False, create_type="invoice", shard=None, shard_count=None
+    ):
         """
         The cron function in order to create recurrent documents
         from contracts.
+
+        When ``shard`` is given, only the contracts belonging to that shard
+        (``id % shard_count``) are processed, by chunks, so that several
+        workers can generate the documents in parallel.
         """
-        _recurring_create_func = self._get_recurring_create_func(
-            create_type=create_type
-        )
         if not date_ref:
             date_ref = fields.Date.context_today(self)
         domain = self._get_contracts_to_invoice_domain(date_ref)
@@ -669,20 +1074,347 @@ class ContractContract(models.Model):
                 [("generation_type", "=", create_type)],
             ]
         )
-        contracts = self.search(domain)
-        companies = set(contracts.mapped("company_id"))
+        contract_ids_by_company = self._get_contract_ids_by_company(domain)
+        run = self.env["contract.invoicing.run"]
+        contracts = self
+        if self._is_invoicing_instrumented():
+            run = run.sudo().create(
+                {
+                    "date_ref": date_ref,
+                    "create_type": create_type,
+                    "contract_count": sum(
+                        len(ids) for ids in contract_ids_by_company.values()
+                    ),
+                }
+            )
+            contracts = self.with_context(contract_invoicing_run_id=run.id)
+        start = time.perf_counter()
+        res = contracts._cron_recurring_create_contracts(
+            contract_ids_by_company,
+            date_ref,
+            create_type,
+            shard=shard,
+            shard_count=shard_count,
+        )
+        if run:
+            run.duration = time.perf_counter() - start
+        return res
+
+    @api.model
+    def _get_contract_ids_by_company(self, domain):
+        """Search the contracts matching ``domain`` whose next recurring date
+        is not after their end date, partitioned by company in one grouped
+        query.
+
+        :return: dictionary {company id: sorted contract ids}, ordered by
+            company id
+        """
+        query = self._search(domain)
+        date_end = self._field_to_sql(query.table, "date_end", query)
+        query.add_where(
+            SQL(
+                "(%s IS NULL OR %s <= %s)",
+                date_end,
+                self._field_to_sql(query.table, "recurring_next_date", query),
+                date_end,
+            )
+        )
+        company_id = self._field_to_sql(query.table, "company_id", query)
+        contract_id = self._field_to_sql(query.table, "id", query)
+        query.groupby = company_id
+        query.order = company_id
+        rows = self.env.execute_query(
+            query.select(
+                company_id, SQL("ARRAY_AGG(%s ORDER BY %s)", contract_id, contract_id)
+            )
+        )
+        return dict(rows)
+
+    @api.model
+    def _cron_recurring_create_contracts(
+        self,
+        contract_ids_by_company,
+        date_ref,
+        create_type,
+        shard=None,
+        shard_count=None,
+    ):
+        """Generate the recurring documents of the due contracts, given by
+        company, see ``_cron_recurring_create``.
+        """
+        _recurring_create_func = self._get_recurring_create_func(
+            create_type=create_type
+        )
+        batch_size = self._get_cron_batch_size()
+        if shard is not None:
+            shard_count = shard_count or self._get_cron_shard_count()
+            if not 0 <= shard < shard_count:
+                raise ValidationError(
+                    self.env._(
+                        "Invalid contract cron shard %(shard)s for %(count)s "
+                        "shards.",
+                        shard=shard,
+                        count=shard_count,
+                    )
+                )
+            contract_ids_by_company = {
+                company_id: [
+                    contract_id
+                    for contract_id in contract_ids
+                    if contract_id % shard_count == shard
+                ]
+                for company_id, contract_ids in contract_ids_by_company.items()
+            }
+            return self._cron_recurring_create_batched(
+                contract_ids_by_company,
+                date_ref,
+                create_type,
+                batch_size or DEFAULT_CRON_SHARD_BATCH_SIZE,
+                shard=shard,
+            )
+        if batch_size:
+            return self._cron_recurring_create_batched(
+                contract_ids_by_company, date_ref, create_type, batch_size
+            )
         # Invoice by companies, so assignation emails get correct context
-        for company in companies:
-            contracts_to_invoice = contracts.filtered(
-                lambda contract, comp=company: contract.company_id == comp
-                and (
-                    not contract.date_end
-                    or contract.recurring_next_date <= contract.date_end
+        for company_id, contract_ids in contract_ids_by_company.items():
+            _recurring_create_func(
+                self.browse(contract_ids).with_company(company_id), date_ref
+            )
+        return True
+
+    @api.model
+    def _get_cron_batch_size(self):
+        """Number of contracts processed (and committed) together by the cron.
+
+        A falsy value keeps the historical behaviour: every company slice is
+        generated in the same transaction.
+        """
+        return int(
+            self.env["ir.config_parameter"]
+            .sudo()
+            .get_param("contract.cron.batch_size", 0)
+        )
+
+    @api.model
+    def _get_cron_shard_count(self):
+        """Number of shards the due contracts are split into when the cron
+        is run in parallel by several workers.
+        """
+        return max(
+            int(
+                self.env["ir.config_parameter"]
+                .sudo()
+                .get_param("contract.cron.shard_count", 1)
+            ),
+            1,
+        )
+
+    @api.model
+    def _get_cron_cursor_key(self, create_type, shard=None):
+        if shard is not None:
+            return f"contract.cron.cursor.{create_type}.{shard}"
+        return f"contract.cron.cursor.{create_type}"
+
+    def _lock_for_cron(self):
+        """Lock the contracts in self for the current transaction, skipping
+        the ones already locked by a concurrent worker.
+
+        Under the repeatable read isolation of the cron cursor, locking a
+        contract updated by a worker that committed after the snapshot of the
+        transaction fails: the whole chunk is then skipped.
+
+        :return: the contracts effectively locked
+        """
+        if not self:
+            return self
+        try:
+            with self.env.cr.savepoint(flush=False):
+                self.env.cr.execute(
+                    SQL(
+                        "SELECT id FROM contract_contract WHERE id IN %s "
+                        "ORDER BY id FOR UPDATE SKIP LOCKED",
+                        tuple(self.ids),
+                    )
                 )
-            ).with_company(company)
-            _recurring_create_func(contracts_to_invoice, date_ref)
+        except SerializationFailure:
+            _logger.info(
+                "Contract cron: contracts %s updated by a concurrent worker, "
+                "skipped",
+                self.ids,
+            )
+            return self.browse()
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
+    @api.model
+    def _get_cron_cursor(self, date_ref, create_type, shard=None):
+        """Return the resume marker left by an interrupted run for the same
+        reference date, as a ``(company_id, contract_id)`` tuple, or None.
+        """
+        value = (
+            self.env["ir.config_parameter"]
+            .sudo()
+            .get_param(self._get_cron_cursor_key(create_type, shard=shard))
+        )
+        if not value:
+            return None
+        cursor = json.loads(value)
+        if cursor.get("date_ref") != str(fields.Date.to_date(date_ref)):
+            return None
+        return cursor["company_id"], cursor["contract_id"]
+
+    @api.model
+    def _set_cron_cursor(self, date_ref, create_type, contract, shard=None):
+        """Persist ``contract`` as the last one processed by the cron run
+        for ``date_ref``. An empty recordset clears the marker.
+        """
+        value = False
+        if contract:
+            value = json.dumps(
+                {
+                    "date_ref": str(fields.Date.to_date(date_ref)),
+                    "company_id": contract.company_id.id,
+                    "contract_id": contract.id,
+                }
+            )
+        self.env["ir.config_parameter"].sudo().set_param(
+            self._get_cron_cursor_key(create_type, shard=shard), value
+        )
+
+    @api.model
+    def _cron_commit(self):
+        """Commit the work done so far, except when running tests."""
+        if not self.env.registry.in_test_mode():
+            self.env.cr.commit()  # pylint: disable=invalid-commit
+
+    @api.model
+    def _cron_recurring_create_batched(
+        self, contract_ids_by_company, date_ref, create_type, batch_size, shard=None
+    ):
+        """Generate the recurring documents of the contracts, given by company,
+        by chunks of ``batch_size`` contracts, committing after each chunk.
+
+        Contracts are still processed company by company. The last processed
+        contract is persisted after every chunk, so that a run interrupted
+        for the same reference date resumes where it stopped.
+
+        Every chunk is locked with ``FOR UPDATE SKIP LOCKED`` before being
+        processed: contracts held by a concurrent worker are skipped, and the
+        ones already invoiced by it for ``date_ref`` are no longer due. The
+        skipped contracts stay due for the next run, and the resume marker
+        never moves past them.
+        """
+        _recurring_create_func = self._get_recurring_create_func(
+            create_type=create_type
+        )
+        date_ref = fields.Date.to_date(date_ref)
+        cursor = self._get_cron_cursor(date_ref, create_type, shard=shard)
+        skipped = self.browse()
+        for company_id, contract_ids in contract_ids_by_company.items():
+            if cursor and company_id < cursor[0]:
+                continue
+            last_contract_id = cursor[1] if cursor and company_id == cursor[0] else 0
+            company = self.env["res.company"].browse(company_id)
+            contract_ids = [
+                contract_id
+                for contract_id in contract_ids
+                if contract_id > last_contract_id
+            ]
+            for chunk in split_every(batch_size, contract_ids, self.browse):
+                start = time.perf_counter()
+                locked = chunk._lock_for_cron()
+                skipped |= chunk - locked
+                locked = locked.filtered(
+                    lambda contract: contract.recurring_next_date
+                    and contract.recurring_next_date <= date_ref
+                )
+                documents = _recurring_create_func(
+                    locked.with_company(company), date_ref
+                )
+                if not skipped:
+                    self._set_cron_cursor(date_ref, create_type, chunk[-1], shard=shard)
+                self._cron_commit()
+                duration = time.perf_counter() - start
+                _logger.info(
+                    "Contract cron (%s) for company %s: %d contracts, "
+                    "%d documents in %.2fs (%.1f contracts/s)",
+                    create_type,
+                    company.name,
+                    len(locked),
+                    len(documents or []),
+                    duration,
+                    len(locked) / duration if duration else 0.0,
+                )
+        if skipped:
+            _logger.info(
+                "Contract cron (%s): %d contracts locked by a concurrent worker "
+                "left for the next run",
+                create_type,
+                len(skipped),
+            )
+        self._set_cron_cursor(date_ref, create_type, self.browse(), shard=shard)
+        self._cron_commit()
         return True
 
     @api.model
     def cron_recurring_create_invoice(self, date_ref=None):
         return self._cron_recurring_create(date_ref, create_type="invoice")
+
+    @api.model
+    def cron_recurring_create_invoice_shard(self, shard, date_ref=None):
+        """Invoice the due contracts of one shard, see
+        ``contract.cron.shard_count``.
+        """
+        return self._cron_recurring_create(date_ref, create_type="invoice", shard=shard)
+
+    @api.model
+    def simulate_recurring_create_invoice(self, date_ref=None, as_json=False):
+        """Dry run of the recurring invoices cron: find the contracts to
+        invoice and prepare the values of their invoices, without creating
+        them nor moving the invoiced dates of the contract lines.
+
+        :param date_ref: optional reference date to use instead of today
+        :param as_json: return the result serialized as JSON
+        :return: dictionary with the prepared ``invoices_values`` and the
+            duration, query and record counts of every ``stages``
+        """
+        date_ref = fields.Date.to_date(date_ref) or fields.Date.context_today(self)
+        stages = {}
+        with self._profile_stage(stages, "search") as stage:
+            domain = expression.AND(
+                [
+                    self._get_contracts_to_invoice_domain(date_ref),
+                    [("generation_type", "=", "invoice")],
+                ]
+            )
+            contract_ids_by_company = self._get_contract_ids_by_company(domain)
+            contracts = self.browse(
+                [
+                    contract_id
+                    for contract_ids in contract_ids_by_company.values()
+                    for contract_id in contract_ids
+                ]
+            )
+            stage["records"] = len(contracts)
+        with self._profile_stage(stages, "lines") as stage:
+            lines_map = contracts._get_lines_to_invoice_map(date_ref)
+            stage["records"] = sum(len(lines) for lines in lines_map.values())
+        invoices_values = []
+        with self._profile_stage(stages, "prepare") as stage:
+            simulated = self.with_context(contract_simulation=True)
+            for company_id, contract_ids in contract_ids_by_company.items():
+                invoices_values += (
+                    simulated.browse(contract_ids)
+                    .with_company(company_id)
+                    ._prepare_recurring_invoices_values(date_ref)
+                )
+            stage["records"] = len(invoices_values)
+        result = {
+            "date_ref": date_ref,
+            "contract_count": len(contracts),
+            "invoices_values": invoices_values,
+            "stages": stages,
+        }
+        if as_json:
+            return json.dumps(result, default=str)
+        return result
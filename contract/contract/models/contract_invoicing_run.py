@@ -0,0 +1,76 @@
+# Copyright 2026 ACSONE SA/NV
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+
+from odoo import api, fields, models
+
+
+class ContractInvoicingRun(models.Model):
+    _name = "contract.invoicing.run"
+    _description = "Contract Invoicing Run"
+    _order = "date_start desc, id desc"
+
+    name = fields.Char(compute="_compute_name")
+    date_ref = fields.Date(string="Reference Date", readonly=True)
+    create_type = fields.Char(readonly=True)
+    date_start = fields.Datetime(
+        string="Started On", readonly=True, default=fields.Datetime.now
+    )
+    duration = fields.Float(readonly=True, help="Duration of the run in seconds.")
+    contract_count = fields.Integer(string="Contracts", readonly=True)
+    batch_count = fields.Integer(string="Batches", readonly=True)
+    stage_ids = fields.One2many(
+        comodel_name="contract.invoicing.run.stage",
+        inverse_name="run_id",
+        string="Stages",
+        readonly=True,
+    )
+    document_count = fields.Integer(
+        string="Documents", compute="_compute_stage_totals", store=True
+    )
+    query_count = fields.Integer(
+        string="Queries", compute="_compute_stage_totals", store=True
+    )
+
+    @api.depends("date_ref", "create_type")
+    def _compute_name(self):
+        for run in self:
+            run.name = f"{run.create_type or ''} {run.date_ref or ''}".strip()
+
+    @api.depends("stage_ids.record_count", "stage_ids.query_count")
+    def _compute_stage_totals(self):
+        for run in self:
+            run.document_count = sum(
+                run.stage_ids.filtered(lambda s: s.name == "create").mapped(
+                    "record_count"
+                )
+            )
+            run.query_count = sum(run.stage_ids.mapped("query_count"))
+
+
+class ContractInvoicingRunStage(models.Model):
+    _name = "contract.invoicing.run.stage"
+    _description = "Contract Invoicing Run Stage"
+    _order = "run_id, batch, id"
+
+    run_id = fields.Many2one(
+        comodel_name="contract.invoicing.run",
+        required=True,
+        ondelete="cascade",
+        index=True,
+    )
+    company_id = fields.Many2one(comodel_name="res.company", readonly=True)
+    batch = fields.Integer(readonly=True)
+    name = fields.Selection(
+        selection=[
+            ("prepare", "Prepare values"),
+            ("create", "Create documents"),
+            ("add_contract_origin", "Post contract origin"),
+            ("invoice_followers", "Subscribe followers"),
+            ("compute_recurring_next_date", "Compute next dates"),
+        ],
+        string="Stage",
+        readonly=True,
+    )
+    duration = fields.Float(readonly=True, help="Duration of the stage in seconds.")
+    query_count = fields.Integer(string="Queries", readonly=True)
+    record_count = fields.Integer(string="Records", readonly=True)
@@ -4,12 +4,28 @@
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
 
 
+import re
 import warnings
+from functools import lru_cache
 
 from dateutil.relativedelta import relativedelta
 
 from odoo import api, fields, models
 from odoo.exceptions import ValidationError
+from odoo.tools import groupby, ormcache
+
+MARKERS_RE = re.compile(r"#(START|END|INVOICEMONTHNAME)#")
+
+
+@lru_cache(maxsize=4096)
+def _parse_markers(name):
+    """Split a line name on its markers.
+
+    :return: a tuple alternating literal parts and marker names (at odd
+        indexes), or None when the name contains no marker
+    """
+    parts = MARKERS_RE.split(name)
+    return tuple(parts) if len(parts) > 1 else None
 
 
 class ContractLine(models.Model):
@@ -41,6 +57,9 @@ class ContractLine(models.Model):
         readonly=True,
     )
     product_id = fields.Many2one(index=True)
+    # Stored, so that the periods to invoice can be searched in SQL
+    next_period_date_start = fields.Date(store=True, index=True)
+    next_period_date_end = fields.Date(store=True, index=True)
 
     @api.depends("name", "date_start")
     def _compute_display_name(self):
@@ -169,10 +188,8 @@ class ContractLine(models.Model):
 
     def _prepare_invoice_line(self):
         self.ensure_one()
-        dates = self._get_period_to_invoice(
-            self.last_date_invoiced, self.recurring_next_date
-        )
-        name = self._insert_markers(dates[0], dates[1])
+        dates = self._get_invoice_period()
+        name = self._get_period_name(dates[0], dates[1])
         return {
             "quantity": self._get_quantity_to_invoice(*dates),
             "product_uom_id": self.uom_id.id,
@@ -210,6 +227,62 @@ class ContractLine(models.Model):
         )
         return first_date_invoiced, last_date_invoiced, recurring_next_date
 
+    def _get_invoice_period(self):
+        """Return the period to invoice for the line, as a tuple
+        ``(first_date_invoiced, last_date_invoiced, recurring_next_date)``:
+        the one given for the line in the ``contract_invoice_periods``
+        context dict when invoicing a catch-up period, the next one otherwise.
+        """
+        self.ensure_one()
+        periods = self.env.context.get("contract_invoice_periods") or {}
+        if self.id in periods:
+            return periods[self.id]
+        return self._get_period_to_invoice(
+            self.last_date_invoiced, self.recurring_next_date
+        )
+
+    def _get_catchup_periods(self, date_ref, max_periods):
+        """Compute with the recurrence engine the periods of the lines of
+        self due at ``date_ref``, up to ``max_periods`` periods per line,
+        starting from their next period. The engine is called once per rank
+        of period for all the lines still due.
+
+        :return: dictionary {line id: list of
+            (first_date_invoiced, last_date_invoiced, recurring_next_date)}
+        """
+        periods_by_line = {}
+        lines = self.filtered(lambda line: not line.is_canceled)
+        periods = [
+            (
+                line.next_period_date_start,
+                line.next_period_date_end,
+                line.recurring_next_date,
+            )
+            for line in lines
+        ]
+        for _rank in range(max(max_periods, 1)):
+            due = [
+                (line, period)
+                for line, period in zip(lines, periods, strict=True)
+                if period[0] and period[1] and period[2] and period[2] <= date_ref
+            ]
+            if not due:
+                break
+            for line, period in due:
+                periods_by_line.setdefault(line.id, []).append(period)
+            lines = self.browse().concat(*[line for line, __ in due])
+            date_starts = [period[1] + relativedelta(days=1) for __, period in due]
+            date_ends, invoice_dates = self.get_next_periods(
+                date_starts,
+                lines.mapped("recurring_rule_type"),
+                lines.mapped("recurring_interval"),
+                lines.mapped("recurring_invoicing_type"),
+                lines.mapped("recurring_invoicing_offset"),
+                lines.mapped("date_end"),
+            )
+            periods = list(zip(date_starts, date_ends, invoice_dates, strict=True))
+        return periods_by_line
+
     def _translate_marker_month_name(self, month_name):
         months = {
             "01": self.env._("January"),
@@ -227,21 +300,81 @@ class ContractLine(models.Model):
         }
         return months[month_name]
 
+    @api.model
+    @ormcache("lang_code")
+    def _get_marker_lang_data(self, lang_code):
+        """Return the date format and the translated month names used to
+        render the markers for the given language code.
+        """
+        lang = self.env["res.lang"].search([("code", "=", lang_code)])
+        translator = self.with_context(lang=lang.code)
+        month_names = tuple(
+            translator._translate_marker_month_name(f"{month:02d}")
+            for month in range(1, 13)
+        )
+        return lang.date_format or "%m/%d/%Y", month_names
+
+    @api.model
+    def _render_markers(self, name, lang_code, first_date_invoiced, last_date_invoiced):
+        parts = _parse_markers(name) if name else None
+        if not parts:
+            return name
+        date_format, month_names = self._get_marker_lang_data(lang_code)
+        rendered = list(parts)
+        for index in range(1, len(parts), 2):
+            if parts[index] == "START":
+                rendered[index] = first_date_invoiced.strftime(date_format)
+            elif parts[index] == "END":
+                rendered[index] = last_date_invoiced.strftime(date_format)
+            else:
+                rendered[index] = month_names[first_date_invoiced.month - 1]
+        return "".join(rendered)
+
     def _insert_markers(self, first_date_invoiced, last_date_invoiced):
         self.ensure_one()
-        lang_obj = self.env["res.lang"]
-        lang = lang_obj.search([("code", "=", self.contract_id.partner_id.lang)])
-        date_format = lang.date_format or "%m/%d/%Y"
-        name = self.name
-        name = name.replace("#START#", first_date_invoiced.strftime(date_format))
-        name = name.replace("#END#", last_date_invoiced.strftime(date_format))
-        name = name.replace(
-            "#INVOICEMONTHNAME#",
-            self.with_context(lang=lang.code)._translate_marker_month_name(
-                first_date_invoiced.strftime("%m")
-            ),
+        return self._render_markers(
+            self.name,
+            self.contract_id.partner_id.lang,
+            first_date_invoiced,
+            last_date_invoiced,
+        )
+
+    def _insert_markers_batch(self, periods):
+        """Render the markers of the names of all the lines of self.
+
+        :param periods: list of (first_date_invoiced, last_date_invoiced)
+            tuples, one per line of self
+        :return: list of rendered names, in the order of self
+        """
+        return [
+            self._render_markers(line.name, line.contract_id.partner_id.lang, *period)
+            for line, period in zip(self, periods, strict=True)
+        ]
+
+    def _memoize_period_names(self, periods):
+        """Render in one batch the names of the lines of self for the given
+        periods, and memoize them in the ``contract_invoice_resolution``
+        context dict for ``_get_period_name``.
+
+        :param periods: list of (first_date_invoiced, last_date_invoiced)
+            tuples, one per line of self
+        """
+        memo = self.env.context.get("contract_invoice_resolution")
+        if memo is None or not self:
+            return
+        names = self._insert_markers_batch(periods)
+        for line, period, name in zip(self, periods, names, strict=True):
+            memo[("period_name", line.id, *period)] = name
+
+    def _get_period_name(self, first_date_invoiced, last_date_invoiced):
+        """Return the name of the line for the given period, using the one
+        memoized by ``_memoize_period_names`` when there is one.
+        """
+        self.ensure_one()
+        return self.contract_id._get_invoice_resolution(
+            ("period_name", self.id, first_date_invoiced, last_date_invoiced),
+            lambda: self._insert_markers(first_date_invoiced, last_date_invoiced),
         )
-        return name
 
     def _update_recurring_next_date(self):
         warnings.warn(
@@ -253,9 +386,13 @@ class ContractLine(models.Model):
         return self._update_last_date_invoiced()
 
     def _update_last_date_invoiced(self):
-        for rec in self:
-            last_date_invoiced = rec.next_period_date_end
-            rec.write(
+        """Move the last invoiced date of the lines to the end of their next
+        period. Lines sharing the same period end are written together, so
+        that the dependent stored fields are recomputed once per group.
+        """
+        lines_by_date = groupby(self, key=lambda line: line.next_period_date_end)
+        for last_date_invoiced, lines in lines_by_date:
+            self.browse().concat(*lines).write(
                 {
                     "last_date_invoiced": last_date_invoiced,
                 }
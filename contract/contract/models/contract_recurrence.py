@@ -0,0 +1,191 @@
+# Copyright 2026 ACSONE SA/NV
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+
+"""Recurrence calendar engine used by ``contract.recurring.mixin``.
+
+The functions below are pure: they only work on dates and recurrence
+parameters, so that whole batches of lines can be computed in one call
+without going through the ORM. Month based rules are computed with plain
+calendar arithmetic, giving the same results as the ``relativedelta``
+based implementation (day clamped to the end of the target month, first
+day of the month for ``monthlylastday``).
+"""
+
+import calendar
+from datetime import timedelta
+from functools import lru_cache
+
+from dateutil.relativedelta import relativedelta
+
+ONE_DAY = timedelta(days=1)
+
+MONTHS_BY_RULE_TYPE = {
+    "monthly": 1,
+    "monthlylastday": 1,
+    "quarterly": 3,
+    "semesterly": 6,
+    "yearly": 12,
+}
+
+
+@lru_cache(maxsize=256)
+def get_relative_delta(recurring_rule_type, interval):
+    """Return a relativedelta for one period based on rule type."""
+    if recurring_rule_type == "daily":
+        return relativedelta(days=interval)
+    elif recurring_rule_type == "weekly":
+        return relativedelta(weeks=interval)
+    elif recurring_rule_type == "monthly":
+        return relativedelta(months=interval)
+    elif recurring_rule_type == "monthlylastday":
+        return relativedelta(months=interval, day=1)
+    elif recurring_rule_type == "quarterly":
+        return relativedelta(months=3 * interval)
+    elif recurring_rule_type == "semesterly":
+        return relativedelta(months=6 * interval)
+    else:  # yearly
+        return relativedelta(years=interval)
+
+
+def add_period(date, recurring_rule_type, interval):
+    """Return ``date + get_relative_delta(recurring_rule_type, interval)``."""
+    if recurring_rule_type == "daily":
+        return date + timedelta(days=interval)
+    if recurring_rule_type == "weekly":
+        return date + timedelta(weeks=interval)
+    months = MONTHS_BY_RULE_TYPE.get(recurring_rule_type, 12) * (interval or 0)
+    month = date.month - 1 + months
+    year = date.year + month // 12
+    month = month % 12 + 1
+    if recurring_rule_type == "monthlylastday":
+        day = 1
+    else:
+        day = min(date.day, calendar.monthrange(year, month)[1])
+    return date.replace(year=year, month=month, day=day)
+
+
+def next_period_date_end(
+    next_period_date_start,
+    recurring_rule_type,
+    recurring_interval,
+    max_date_end,
+    next_invoice_date=False,
+    recurring_invoicing_type=False,
+    recurring_invoicing_offset=False,
+):
+    """Compute the end date for the next period."""
+    if not next_period_date_start or (
+        max_date_end and next_period_date_start > max_date_end
+    ):
+        return False
+    if not next_invoice_date:
+        # Regular case: use relative delta
+        date_end = (
+            add_period(next_period_date_start, recurring_rule_type, recurring_interval)
+            - ONE_DAY
+        )
+    elif recurring_invoicing_type == "pre-paid":
+        # Forced invoice date: back-calculate period end
+        date_end = (
+            add_period(
+                next_invoice_date - timedelta(days=recurring_invoicing_offset or 0),
+                recurring_rule_type,
+                recurring_interval,
+            )
+            - ONE_DAY
+        )
+    else:  # post-paid
+        date_end = next_invoice_date - timedelta(days=recurring_invoicing_offset or 0)
+    if max_date_end and date_end > max_date_end:
+        date_end = max_date_end
+    return date_end
+
+
+def next_invoice_date(
+    next_period_date_start,
+    recurring_invoicing_type,
+    recurring_invoicing_offset,
+    recurring_rule_type,
+    recurring_interval,
+    max_date_end,
+):
+    """Compute the date of the next invoice based on all parameters."""
+    date_end = next_period_date_end(
+        next_period_date_start,
+        recurring_rule_type,
+        recurring_interval,
+        max_date_end,
+    )
+    if not date_end:
+        return False
+    offset = timedelta(days=recurring_invoicing_offset or 0)
+    if recurring_invoicing_type == "pre-paid":
+        return next_period_date_start + offset
+    return date_end + offset
+
+
+def compute_periods(
+    date_starts,
+    recurring_rule_types,
+    recurring_intervals,
+    recurring_invoicing_types,
+    recurring_invoicing_offsets,
+    max_date_ends,
+    next_invoice_dates=None,
+):
+    """Batch version of :func:`next_period_date_end` and
+    :func:`next_invoice_date`.
+
+    All the arguments are sequences of the same length, one item per
+    period to compute. ``next_invoice_dates`` is optional and, when given,
+    forces the invoice date used to back-calculate the period end exactly
+    like the ``next_invoice_date`` argument of :func:`next_period_date_end`.
+
+    :return: a tuple ``(period_date_ends, invoice_dates)`` of lists.
+    """
+    if next_invoice_dates is None:
+        next_invoice_dates = [False] * len(date_starts)
+    period_date_ends = []
+    invoice_dates = []
+    for (
+        date_start,
+        rule_type,
+        interval,
+        invoicing_type,
+        offset,
+        max_date_end,
+        forced_invoice_date,
+    ) in zip(
+        date_starts,
+        recurring_rule_types,
+        recurring_intervals,
+        recurring_invoicing_types,
+        recurring_invoicing_offsets,
+        max_date_ends,
+        next_invoice_dates,
+        strict=True,
+    ):
+        natural_date_end = next_period_date_end(
+            date_start, rule_type, interval, max_date_end
+        )
+        if forced_invoice_date:
+            period_date_ends.append(
+                next_period_date_end(
+                    date_start,
+                    rule_type,
+                    interval,
+                    max_date_end,
+                    next_invoice_date=forced_invoice_date,
+                    recurring_invoicing_type=invoicing_type,
+                    recurring_invoicing_offset=offset,
+                )
+            )
+        else:
+            period_date_ends.append(natural_date_end)
+        if not natural_date_end:
+            invoice_dates.append(False)
+        elif invoicing_type == "pre-paid":
+            invoice_dates.append(date_start + timedelta(days=offset or 0))
+        else:
+            invoice_dates.append(natural_date_end + timedelta(days=offset or 0))
+    return period_date_ends, invoice_dates
@@ -11,6 +11,8 @@ from dateutil.relativedelta import relativedelta
 
 from odoo import api, fields, models
 
+from . import contract_recurrence
+
 
 class ContractRecurringMixin(models.AbstractModel):
     """Abstract model to support recurring invoicing logic."""
@@ -116,16 +118,11 @@ class ContractRecurringMixin(models.AbstractModel):
     )
     def _compute_next_period_date_end(self):
         """Compute the end date of the next billing period."""
-        for rec in self:
-            rec.next_period_date_end = self.get_next_period_date_end(
-                rec.next_period_date_start,
-                rec.recurring_rule_type,
-                rec.recurring_interval,
-                max_date_end=rec.date_end,
-                next_invoice_date=rec.recurring_next_date,
-                recurring_invoicing_type=rec.recurring_invoicing_type,
-                recurring_invoicing_offset=rec.recurring_invoicing_offset,
-            )
+        period_date_ends, _invoice_dates = self._get_next_periods(
+            force_next_invoice_date=True
+        )
+        for rec, period_date_end in zip(self, period_date_ends, strict=True):
+            rec.next_period_date_end = period_date_end
 
     @api.depends("recurring_invoicing_type", "recurring_rule_type")
     def _compute_recurring_invoicing_offset(self):
@@ -146,35 +143,118 @@ class ContractRecurringMixin(models.AbstractModel):
     )
     def _compute_recurring_next_date(self):
         """Compute the next invoice date."""
-        for rec in self:
-            rec.recurring_next_date = self.get_next_invoice_date(
-                rec.next_period_date_start,
-                rec.recurring_invoicing_type,
-                rec.recurring_invoicing_offset,
-                rec.recurring_rule_type,
-                rec.recurring_interval,
-                max_date_end=rec.date_end,
-            )
+        _period_date_ends, invoice_dates = self._get_next_periods()
+        for rec, invoice_date in zip(self, invoice_dates, strict=True):
+            rec.recurring_next_date = invoice_date
 
     # === Utility Methods ===
 
+    def _get_next_periods(self, force_next_invoice_date=False):
+        """Run the recurrence engine on the next period of every record.
+
+        :param force_next_invoice_date: back-calculate the period ends from
+            the current ``recurring_next_date`` of the records
+        :return: a tuple ``(period_date_ends, invoice_dates)`` of lists
+        """
+        return self.get_next_periods(
+            [rec.next_period_date_start for rec in self],
+            [rec.recurring_rule_type for rec in self],
+            [rec.recurring_interval for rec in self],
+            [rec.recurring_invoicing_type for rec in self],
+            [rec.recurring_invoicing_offset for rec in self],
+            [rec.date_end for rec in self],
+            next_invoice_dates=(
+                [rec.recurring_next_date for rec in self]
+                if force_next_invoice_date
+                else None
+            ),
+        )
+
+    @api.model
+    def get_next_periods(
+        self,
+        next_period_date_starts,
+        recurring_rule_types,
+        recurring_intervals,
+        recurring_invoicing_types,
+        recurring_invoicing_offsets,
+        max_date_ends,
+        next_invoice_dates=None,
+    ):
+        """Batch computation of period end and invoice dates.
+
+        Every argument is a list with one item per period to compute, see
+        :func:`contract_recurrence.compute_periods`. When a model overrides
+        ``get_next_period_date_end`` or ``get_next_invoice_date``, every
+        period goes through these methods instead of the engine.
+
+        :return: a tuple ``(period_date_ends, invoice_dates)`` of lists
+        """
+        cls = type(self)
+        if (
+            cls.get_next_period_date_end
+            is ContractRecurringMixin.get_next_period_date_end
+            and cls.get_next_invoice_date
+            is ContractRecurringMixin.get_next_invoice_date
+        ):
+            return contract_recurrence.compute_periods(
+                next_period_date_starts,
+                recurring_rule_types,
+                recurring_intervals,
+                recurring_invoicing_types,
+                recurring_invoicing_offsets,
+                max_date_ends,
+                next_invoice_dates=next_invoice_dates,
+            )
+        if next_invoice_dates is None:
+            next_invoice_dates = [False] * len(next_period_date_starts)
+        period_date_ends = []
+        invoice_dates = []
+        for (
+            date_start,
+            rule_type,
+            interval,
+            invoicing_type,
+            offset,
+            max_date_end,
+            next_invoice_date,
+        ) in zip(
+            next_period_date_starts,
+            recurring_rule_types,
+            recurring_intervals,
+            recurring_invoicing_types,
+            recurring_invoicing_offsets,
+            max_date_ends,
+            next_invoice_dates,
+            strict=True,
+        ):
+            period_date_ends.append(
+                self.get_next_period_date_end(
+                    date_start,
+                    rule_type,
+                    interval,
+                    max_date_end,
+                    next_invoice_date=next_invoice_date,
+                    recurring_invoicing_type=invoicing_type,
+                    recurring_invoicing_offset=offset,
+                )
+            )
+            invoice_dates.append(
+                self.get_next_invoice_date(
+                    date_start,
+                    invoicing_type,
+                    offset,
+                    rule_type,
+                    interval,
+                    max_date_end,
+                )
+            )
+        return period_date_ends, invoice_dates
+
     @api.model
     def get_relative_delta(self, recurring_rule_type, interval):
         """Return a relativedelta for one period based on rule type."""
-        if recurring_rule_type == "daily":
-            return relativedelta(days=interval)
-        elif recurring_rule_type == "weekly":
-            return relativedelta(weeks=interval)
-        elif recurring_rule_type == "monthly":
-            return relativedelta(months=interval)
-        elif recurring_rule_type == "monthlylastday":
-            return relativedelta(months=interval, day=1)
-        elif recurring_rule_type == "quarterly":
-            return relativedelta(months=3 * interval)
-        elif recurring_rule_type == "semesterly":
-            return relativedelta(months=6 * interval)
-        else:  # yearly
-            return relativedelta(years=interval)
+        return contract_recurrence.get_relative_delta(recurring_rule_type, interval)
 
     @api.model
     def get_next_period_date_end(
@@ -188,35 +268,15 @@ class ContractRecurringMixin(models.AbstractModel):
         recurring_invoicing_offset=False,
     ):
         """Compute the end date for the next period."""
-        if not next_period_date_start or (
-            max_date_end and next_period_date_start > max_date_end
-        ):
-            return False
-
-        if not next_invoice_date:
-            # Regular case: use relative delta
-            next_period_date_end = (
-                next_period_date_start
-                + self.get_relative_delta(recurring_rule_type, recurring_interval)
-                - relativedelta(days=1)
-            )
-        else:
-            # Forced invoice date: back-calculate period end
-            if recurring_invoicing_type == "pre-paid":
-                next_period_date_end = (
-                    next_invoice_date
-                    - relativedelta(days=recurring_invoicing_offset)
-                    + self.get_relative_delta(recurring_rule_type, recurring_interval)
-                    - relativedelta(days=1)
-                )
-            else:  # post-paid
-                next_period_date_end = next_invoice_date - relativedelta(
-                    days=recurring_invoicing_offset
-                )
-
-        if max_date_end and next_period_date_end > max_date_end:
-            next_period_date_end = max_date_end
-        return next_period_date_end
+        return contract_recurrence.next_period_date_end(
+            next_period_date_start,
+            recurring_rule_type,
+            recurring_interval,
+            max_date_end,
+            next_invoice_date=next_invoice_date,
+            recurring_invoicing_type=recurring_invoicing_type,
+            recurring_invoicing_offset=recurring_invoicing_offset,
+        )
 
     @api.model
     def get_next_invoice_date(
@@ -229,21 +289,14 @@ class ContractRecurringMixin(models.AbstractModel):
         max_date_end,
     ):
         """Compute the date of the next invoice based on all parameters."""
-        next_period_date_end = self.get_next_period_date_end(
+        return contract_recurrence.next_invoice_date(
             next_period_date_start,
+            recurring_invoicing_type,
+            recurring_invoicing_offset,
             recurring_rule_type,
             recurring_interval,
-            max_date_end=max_date_end,
+            max_date_end,
         )
-        if not next_period_date_end:
-            return False
-
-        if recurring_invoicing_type == "pre-paid":
-            return next_period_date_start + relativedelta(
-                days=recurring_invoicing_offset
-            )
-        else:
-            return next_period_date_end + relativedelta(days=recurring_invoicing_offset)
 
     @api.model
     def _get_default_recurring_invoicing_offset(
@@ -6,7 +6,7 @@
 # Copyright 2018 ACSONE SA/NV
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
 
-from odoo import api, fields, models
+from odoo import Command, api, fields, models
 
 
 class ContractTemplate(models.Model):
@@ -99,3 +99,84 @@ class ContractTemplate(models.Model):
             ]
 
             contract.journal_id = AccountJournal.search(domain, limit=1).id or None
+
+    def _prepare_contract_values(self):
+        """Return the values of the template copied to the contracts created
+        from it, as the contract form does when the template is selected.
+        """
+        self.ensure_one()
+        contract_model = self.env["contract.contract"]
+        fnames = [
+            name
+            for name, field in self._fields.items()
+            if name != "contract_line_ids"
+            and name in contract_model._fields
+            and not any(
+                (
+                    field.compute,
+                    field.related,
+                    field.automatic,
+                    field.readonly,
+                    field.company_dependent,
+                    name in contract_model.NO_SYNC,
+                )
+            )
+        ]
+        values = self._convert_to_write(self.read(fnames)[0])
+        values.pop("id", None)
+        return {name: value for name, value in values.items() if value}
+
+    def _prepare_contract_line_values(self, date_start):
+        """Return the values of the contract lines copied from the template
+        lines, starting on ``date_start``.
+
+        All the template lines are read at once, so the result can be reused
+        for every contract created from the template.
+        """
+        self.ensure_one()
+        line_model = self.env["contract.line"]
+        template_lines = self.contract_line_ids
+        fnames = [
+            name
+            for name, field in template_lines._fields.items()
+            if name != "contract_id"
+            and name in line_model._fields
+            and field.store
+            and not field.automatic
+            and not field.related
+            and not field.readonly
+        ]
+        lines_values = []
+        for values in template_lines.read(fnames):
+            values = template_lines._convert_to_write(values)
+            values.pop("id", None)
+            values["date_start"] = date_start
+            values["recurring_next_date"] = date_start
+            lines_values.append(values)
+        return lines_values
+
+    def create_contracts(self, vals_list):
+        """Create one contract from the template for each values dictionary
+        of ``vals_list``, in a single ``create`` call.
+
+        The values of the template and of its lines are computed once and
+        completed by each dictionary, which overrides them (typically with
+        ``partner_id``, ``name`` or the partner dependent fields that the
+        contract form sets on partner change).
+
+        :return: the created contracts
+        """
+        self.ensure_one()
+        contract_values = self._prepare_contract_values()
+        lines_values = self._prepare_contract_line_values(
+            fields.Date.context_today(self)
+        )
+        contracts_values = []
+        for vals in vals_list:
+            values = dict(contract_values, contract_template_id=self.id)
+            values["contract_line_ids"] = [
+                Command.create(dict(line_values)) for line_values in lines_values
+            ]
+            values.update(vals)
+            contracts_values.append(values)
+        return self.env["contract.contract"].create(contracts_values)
@@ -6,6 +6,8 @@
 # Copyright 2018 ACSONE SA/NV
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
 
+from collections import defaultdict
+
 from odoo import api, fields, models
 from odoo.exceptions import ValidationError
 
@@ -186,6 +188,14 @@ class ContractTemplateLine(models.Model):
         "contract_id.partner_id",
     )
     def _compute_price_unit(self):
+        """Evaluate the automatic prices by groups of lines sharing the same
+        pricelist, partner, unit of measure, quantity and date: each
+        pricelist is evaluated once per group for all its products.
+
+        Within an invoicing run, the prices are also kept in the run cache
+        (``contract_invoice_resolution`` context key).
+        """
+        lines_by_key = defaultdict(list)
         for line in self:
             if line.automatic_price and line.product_id:
                 pricelist = (
@@ -194,18 +204,39 @@ class ContractTemplateLine(models.Model):
                         line.contract_id.company_id
                     ).property_product_pricelist
                 )
-                product = line.product_id.with_context(
-                    quantity=line.env.context.get("contract_line_qty", line.quantity),
-                    pricelist=pricelist.id,
-                    partner=line.contract_id.partner_id.id,
-                    uom=line.uom_id.id,
-                    date=line.env.context.get(
-                        "old_date", fields.Date.context_today(line)
-                    ),
+                key = (
+                    pricelist,
+                    line.contract_id.partner_id.id,
+                    line.uom_id.id,
+                    line.env.context.get("contract_line_qty", line.quantity),
+                    line.env.context.get("old_date", fields.Date.context_today(line)),
                 )
-                line.price_unit = pricelist._get_product_price(product, quantity=1)
+                lines_by_key[key].append(line)
             else:
                 line.price_unit = line.specific_price
+        cache = self.env.context.get("contract_invoice_resolution")
+        for key, lines in lines_by_key.items():
+            pricelist, partner_id, uom_id, quantity, date = key
+            cache_key = ("price", pricelist.id, partner_id, uom_id, quantity, date)
+            prices = cache.setdefault(cache_key, {}) if cache is not None else {}
+            product_ids = {
+                line.product_id.id for line in lines if line.product_id.id not in prices
+            }
+            if product_ids:
+                products = (
+                    self.env["product.product"]
+                    .browse(product_ids)
+                    .with_context(
+                        quantity=quantity,
+                        pricelist=pricelist.id,
+                        partner=partner_id,
+                        uom=uom_id,
+                        date=date,
+                    )
+                )
+                prices.update(pricelist._get_products_price(products, quantity=1))
+            for line in lines:
+                line.price_unit = prices[line.product_id.id]
 
     # Tip in https://github.com/odoo/odoo/issues/23891#issuecomment-376910788
     @api.onchange("price_unit")
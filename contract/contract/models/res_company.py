@@ -0,0 +1,29 @@
+# Copyright 2026 ACSONE SA/NV
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+
+from odoo import fields, models
+
+
+class ResCompany(models.Model):
+    _inherit = "res.company"
+
+    contract_catchup_mode = fields.Selection(
+        selection=[
+            ("none", "Disabled"),
+            ("per_period", "One invoice per period"),
+            ("consolidated", "One consolidated invoice"),
+        ],
+        string="Contract Catch-up Mode",
+        default="none",
+        required=True,
+        help="How the recurring invoices cron invoices the contracts having "
+        "several periods due: by default, only one period is invoiced per "
+        "run. Otherwise, all the due periods are invoiced in the same run, "
+        "either with one invoice per period or in one consolidated invoice.",
+    )
+    contract_catchup_max_periods = fields.Integer(
+        string="Contract Catch-up Maximum Periods",
+        default=12,
+        help="Maximum number of periods invoiced at once for a contract by "
+        "the recurring invoices cron in catch-up mode.",
+    )
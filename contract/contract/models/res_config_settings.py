@@ -0,0 +1,17 @@
+# Copyright 2026 ACSONE SA/NV
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+
+from odoo import fields, models
+
+
+class ResConfigSettings(models.TransientModel):
+    _inherit = "res.config.settings"
+
+    contract_catchup_mode = fields.Selection(
+        related="company_id.contract_catchup_mode",
+        readonly=False,
+    )
+    contract_catchup_max_periods = fields.Integer(
+        related="company_id.contract_catchup_max_periods",
+        readonly=False,
+    )
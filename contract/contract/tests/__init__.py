@@ -2,3 +2,4 @@ from . import test_contract
 from . import test_contract_manually_create_invoice
 from . import test_portal
 from . import test_multicompany
+from . import test_contract_recurrence
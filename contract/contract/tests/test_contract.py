@@ -3,15 +3,20 @@
 # Copyright 2021 Tecnativa - Víctor Martínez
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
 
+import json
 import logging
 from collections import namedtuple
+from unittest import mock
 
 from dateutil.relativedelta import relativedelta
 from freezegun import freeze_time
+from psycopg2.errors import SerializationFailure
 
-from odoo import Command, fields
+from odoo import Command, fields, models
 from odoo.exceptions import ValidationError
+from odoo.osv import expression
 from odoo.tests import Form, common
+from odoo.tools import SQL
 
 
 def to_date(date):
@@ -167,6 +172,17 @@ class TestContract(TestContractBase):
         vals.update(overrides)
         return self.env["contract.template.line"].create(vals)
 
+    def _explain(self, model, domain):
+        """Return the plan of the search of ``domain`` on ``model``, as if
+        the table was big enough for the planner to prefer its indexes.
+        """
+        self.env.flush_all()
+        self.env.cr.execute("SET LOCAL enable_seqscan TO off")
+        self.addCleanup(self.env.cr.execute, "RESET enable_seqscan")
+        query = self.env[model]._search(domain)
+        self.env.cr.execute(SQL("EXPLAIN %s", query.select()))
+        return "\n".join(row[0] for row in self.env.cr.fetchall())
+
     def _get_mail_messages_prev(self, contract, subtype):
         return (
             self.env["mail.message"]
@@ -240,6 +256,30 @@ class TestContract(TestContractBase):
         self.acct_line.invalidate_model()
         self.assertEqual(self.acct_line.price_unit, 10)
 
+    def test_automatic_price_batch(self):
+        self.product_1.list_price = 1100
+        self.product_2.list_price = 200
+        lines = self.acct_line | self.acct_line.copy({"product_id": self.product_2.id})
+        lines |= self.acct_line.copy()
+        lines.automatic_price = True
+        lines.invalidate_recordset(["price_unit"])
+        Pricelist = type(self.env["product.pricelist"])
+        with mock.patch.object(
+            Pricelist,
+            "_get_products_price",
+            autospec=True,
+            side_effect=Pricelist._get_products_price,
+        ) as pricer:
+            self.assertEqual(lines.mapped("price_unit"), [1100, 200, 1100])
+            self.assertEqual(pricer.call_count, 1)
+            # Prices are kept for the whole invoicing run
+            cache = {}
+            lines.invalidate_recordset(["price_unit"])
+            lines.with_context(contract_invoice_resolution=cache).mapped("price_unit")
+            lines.invalidate_recordset(["price_unit"])
+            lines.with_context(contract_invoice_resolution=cache).mapped("price_unit")
+            self.assertEqual(pricer.call_count, 2)
+
     def test_automatic_price_change(self):
         self.acct_line.automatic_price = True
         self.product_1.list_price = 1100
@@ -296,6 +336,82 @@ class TestContract(TestContractBase):
         self.assertTrue(invoice_daily)
         self.assertTrue(self.contract.partner_id in invoice_daily.message_partner_ids)
 
+    def test_get_lines_to_invoice_map(self):
+        def note(sequence, mode):
+            return {
+                "contract_id": self.contract.id,
+                "display_type": "line_note",
+                "name": f"Note {sequence}",
+                "note_invoicing_mode": mode,
+                "sequence": sequence,
+            }
+
+        line_model = self.env["contract.line"]
+        section = line_model.create(
+            {
+                "contract_id": self.contract.id,
+                "display_type": "line_section",
+                "name": "Section",
+                "sequence": 1,
+            }
+        )
+        note_next = line_model.create(note(2, "with_next_line"))
+        self.acct_line.sequence = 3
+        note_previous = line_model.create(note(4, "with_previous_line"))
+        line_model.create(
+            {
+                "contract_id": self.contract.id,
+                "display_type": "line_section",
+                "name": "Empty section",
+                "sequence": 5,
+            }
+        )
+        line_model.create(
+            dict(
+                self.line_vals,
+                sequence=6,
+                date_start="2099-01-01",
+                recurring_next_date="2099-01-01",
+            )
+        )
+        line_model.create(note(7, "with_previous_line"))
+        contracts = self.contract | self.contract2
+        date_ref = to_date("2018-02-28")
+        lines_map = contracts._get_lines_to_invoice_map(date_ref)
+        self.assertEqual(
+            lines_map[self.contract.id].ids,
+            [section.id, note_next.id, self.acct_line.id, note_previous.id],
+        )
+        self.assertEqual(
+            lines_map[self.contract2.id],
+            self.contract2._get_lines_to_invoice(date_ref),
+        )
+        self.assertEqual(
+            self.contract._get_lines_to_invoice(to_date("2018-01-01")).ids, []
+        )
+
+    def test_contract_invoice_chatter_batch(self):
+        partner2 = self.partner.copy()
+        subtype = self.env.ref("contract.mail_message_subtype_invoice_created")
+        contracts = self.contract | self.contract2
+        self.contract.message_subscribe(
+            partner_ids=partner2.ids, subtype_ids=subtype.ids
+        )
+        self.contract2.message_subscribe(
+            partner_ids=partner2.ids, subtype_ids=subtype.ids
+        )
+        invoices = contracts._recurring_create_invoice()
+        self.assertEqual(len(invoices), 2)
+        for contract in contracts:
+            invoice = contract._get_related_invoices()
+            self.assertIn(partner2, invoice.message_partner_ids)
+            message = invoice.message_ids.filtered(
+                lambda msg, c=contract: c.display_name in (msg.body or "")
+            )
+            self.assertEqual(len(message), 1)
+            self.assertEqual(message.subtype_id, self.env.ref("mail.mt_note"))
+            self.assertIn("by contract", message.body)
+
     def test_contract_invoice_salesperson(self):
         self.acct_line.recurring_next_date = "2018-02-23"
         self.acct_line.recurring_rule_type = "daily"
@@ -570,6 +686,41 @@ class TestContract(TestContractBase):
                     )
                 self.assertEqual(test_value, value)
 
+    def test_create_contracts_from_template(self):
+        """It should create the contracts and their lines in one create."""
+        partners = self.env["res.partner"].create(
+            [{"name": f"Template partner {i}"} for i in range(3)]
+        )
+        with mock.patch.object(
+            type(self.env["contract.contract"]),
+            "create",
+            autospec=True,
+            side_effect=type(self.env["contract.contract"]).create,
+        ) as create:
+            contracts = self.template.create_contracts(
+                [
+                    {"name": partner.name, "partner_id": partner.id}
+                    for partner in partners
+                ]
+            )
+        self.assertEqual(create.call_count, 1)
+        self.assertEqual(contracts.partner_id, partners)
+        self.assertEqual(contracts.contract_template_id, self.template)
+        self.assertEqual(contracts.mapped("name"), partners.mapped("name"))
+        today = fields.Date.context_today(self.template)
+        for contract in contracts:
+            self.assertEqual(len(contract.contract_line_ids), 2)
+            line = contract.contract_line_ids.filtered(
+                lambda line: not line.display_type
+            )
+            for key, value in self.line_template_vals.items():
+                test_value = line[key]
+                if isinstance(test_value, models.BaseModel):
+                    test_value = test_value.id
+                self.assertEqual(test_value, value)
+            self.assertEqual(line.date_start, today)
+            self.assertEqual(line.recurring_next_date, today)
+
     def test_send_mail_contract(self):
         result = self.contract.action_contract_send()
         self.assertEqual(result["res_model"], "mail.compose.message")
@@ -776,6 +927,36 @@ class TestContract(TestContractBase):
                 error_message(*combination),
             )
 
+    def test_next_period_stored(self):
+        self.acct_line.write(
+            {
+                "date_start": "2018-01-01",
+                "date_end": "2018-12-31",
+                "recurring_invoicing_type": "post-paid",
+                "recurring_rule_type": "monthly",
+                "recurring_interval": 1,
+            }
+        )
+
+        def search_period(date_start, date_end):
+            return self.env["contract.line"].search(
+                [
+                    ("next_period_date_start", "=", date_start),
+                    ("next_period_date_end", "=", date_end),
+                ]
+            )
+
+        self.assertIn(self.acct_line, search_period("2018-01-01", "2018-01-31"))
+        self.acct_line.last_date_invoiced = "2018-01-31"
+        self.assertIn(self.acct_line, search_period("2018-02-01", "2018-02-28"))
+        self.acct_line.recurring_rule_type = "quarterly"
+        self.assertIn(self.acct_line, search_period("2018-02-01", "2018-04-30"))
+        self.acct_line.date_end = "2018-03-15"
+        self.assertIn(self.acct_line, search_period("2018-02-01", "2018-03-15"))
+        self.acct_line.date_start = "2018-03-01"
+        self.acct_line.last_date_invoiced = False
+        self.assertIn(self.acct_line, search_period("2018-03-01", "2018-03-15"))
+
     def test_next_invoicing_period(self):
         """Test different combination for next invoicing period
         {
@@ -1093,6 +1274,312 @@ class TestContract(TestContractBase):
             len(invoice_lines),
         )
 
+    def test_recurring_next_date_min_lines(self):
+        line2 = self.acct_line.copy({"recurring_next_date": "2018-01-10"})
+        self.acct_line.copy({"recurring_next_date": "2018-01-05", "is_canceled": True})
+        contract4 = self.contract.copy()
+        contracts = self.contract | contract4
+        contract4.contract_line_ids.write({"recurring_next_date": "2018-03-01"})
+        self.assertEqual(
+            contracts._get_lines_recurring_next_date_map(),
+            {
+                self.contract.id: to_date("2018-01-10"),
+                contract4.id: to_date("2018-03-01"),
+            },
+        )
+        self.assertEqual(self.contract.recurring_next_date, to_date("2018-01-10"))
+        self.assertEqual(contract4.recurring_next_date, to_date("2018-03-01"))
+        line2.is_canceled = True
+        self.assertEqual(
+            self.contract.recurring_next_date, self.acct_line.recurring_next_date
+        )
+
+    def test_recurring_next_date_archived_contract(self):
+        self.acct_line.recurring_next_date = "2018-03-01"
+        self.contract.active = False
+        self.assertFalse(self.acct_line.active)
+        self.assertEqual(
+            self.contract._get_lines_recurring_next_date_map(),
+            {self.contract.id: to_date("2018-03-01")},
+        )
+        self.contract.invalidate_recordset(["recurring_next_date"])
+        self.contract._compute_recurring_next_date()
+        self.assertEqual(self.contract.recurring_next_date, to_date("2018-03-01"))
+
+    def test_recurring_create_invoice_catchup(self):
+        self.acct_line.write(
+            {
+                "date_start": "2018-01-01",
+                "recurring_invoicing_type": "post-paid",
+                "date_end": "2018-03-31",
+            }
+        )
+        company = self.contract.company_id
+        company.contract_catchup_mode = "per_period"
+        company.contract_catchup_max_periods = 2
+        date_ref = to_date("2018-12-31")
+        invoices = self.contract._recurring_create_invoice(date_ref)
+        self.assertEqual(len(invoices), 2)
+        self.assertEqual(self.acct_line.last_date_invoiced, to_date("2018-02-28"))
+        company.contract_catchup_mode = "consolidated"
+        invoices = self.contract._recurring_create_invoice(date_ref)
+        self.assertEqual(len(invoices), 1)
+        self.assertEqual(len(invoices.invoice_line_ids), 1)
+        self.assertEqual(self.acct_line.last_date_invoiced, to_date("2018-03-31"))
+        self.assertEqual(len(self.contract._get_related_invoices()), 3)
+
+    def test_recurring_create_invoice_catchup_consolidated(self):
+        self.acct_line.write(
+            {
+                "date_start": "2018-01-01",
+                "recurring_invoicing_type": "post-paid",
+                "date_end": "2018-06-30",
+            }
+        )
+        self.contract.company_id.contract_catchup_mode = "consolidated"
+        invoices = self.contract._recurring_create_invoice(to_date("2018-12-31"))
+        self.assertEqual(len(invoices), 1)
+        self.assertEqual(
+            invoices.invoice_line_ids.mapped("contract_line_id"), self.acct_line
+        )
+        self.assertEqual(len(invoices.invoice_line_ids), 6)
+        self.assertFalse(self.acct_line.recurring_next_date)
+
+    def test_recurring_create_invoice_catchup_periods(self):
+        self.acct_line.write(
+            {
+                "date_start": "2018-01-01",
+                "recurring_invoicing_type": "post-paid",
+                "date_end": "2018-03-31",
+            }
+        )
+        date_ref = to_date("2018-12-31")
+        periods = [
+            ("2018-01-01", "2018-01-31", "2018-02-01"),
+            ("2018-02-01", "2018-02-28", "2018-03-01"),
+            ("2018-03-01", "2018-03-31", "2018-04-01"),
+        ]
+        self.assertEqual(
+            self.acct_line._get_catchup_periods(date_ref, 12),
+            {self.acct_line.id: [tuple(map(to_date, dates)) for dates in periods]},
+        )
+        self.assertEqual(
+            len(self.acct_line._get_catchup_periods(date_ref, 2)[self.acct_line.id]), 2
+        )
+        self.contract.company_id.contract_catchup_mode = "per_period"
+        contract_line_cls = self.env.registry["contract.line"]
+        original_write = contract_line_cls.write
+        written = []
+
+        def write(records, vals):
+            if "last_date_invoiced" in vals:
+                written.append((records.ids, vals["last_date_invoiced"]))
+            return original_write(records, vals)
+
+        with mock.patch.object(contract_line_cls, "write", write):
+            invoices = self.contract._recurring_create_invoice(date_ref)
+        # The invoiced dates are moved once, to the end of the last period
+        self.assertEqual(written, [(self.acct_line.ids, to_date("2018-03-31"))])
+        self.assertEqual(
+            invoices.invoice_line_ids.mapped("name"),
+            [
+                "Services from 01/01/2018 to 01/31/2018",
+                "Services from 02/01/2018 to 02/28/2018",
+                "Services from 03/01/2018 to 03/31/2018",
+            ],
+        )
+
+    def test_get_contract_ids_by_company(self):
+        self.acct_line.write(
+            {"date_start": "2018-01-01", "recurring_next_date": "2018-01-31"}
+        )
+        company2 = self.env["res.company"].create({"name": "Contract company 2"})
+        contract_company2 = self.contract.copy({"company_id": company2.id})
+        ended = self.contract.copy()
+        ended.contract_line_ids.write({"date_end": "2018-01-15"})
+        ended.write({"date_end": "2018-01-15", "recurring_next_date": "2018-01-31"})
+        ids_by_company = self.env["contract.contract"]._get_contract_ids_by_company(
+            [("id", "in", (self.contract | contract_company2 | ended).ids)]
+        )
+        self.assertEqual(
+            ids_by_company,
+            {
+                self.contract.company_id.id: [self.contract.id],
+                company2.id: [contract_company2.id],
+            },
+        )
+        self.assertEqual(list(ids_by_company), sorted(ids_by_company))
+
+    def test_cron_recurring_create_invoice_batched(self):
+        self.acct_line.date_start = "2018-01-01"
+        self.acct_line.recurring_invoicing_type = "post-paid"
+        self.acct_line.date_end = "2018-03-15"
+        contracts = self.contract2
+        for _i in range(5):
+            contracts |= self.contract.copy()
+        self.env["ir.config_parameter"].sudo().set_param("contract.cron.batch_size", 2)
+        self.env["contract.contract"].cron_recurring_create_invoice()
+        invoice_lines = self.env["account.move.line"].search(
+            [("contract_line_id", "in", contracts.mapped("contract_line_ids").ids)]
+        )
+        self.assertEqual(
+            len(contracts.mapped("contract_line_ids")),
+            len(invoice_lines),
+        )
+        # The resume marker is cleared once the run is complete
+        self.assertFalse(
+            self.env["ir.config_parameter"]
+            .sudo()
+            .get_param("contract.cron.cursor.invoice")
+        )
+
+    def test_cron_recurring_create_invoice_resume(self):
+        self.acct_line.date_start = "2018-01-01"
+        self.acct_line.recurring_invoicing_type = "post-paid"
+        self.acct_line.date_end = "2018-03-15"
+        contracts = self.env["contract.contract"]
+        for _i in range(4):
+            contracts |= self.contract.copy()
+        contracts = contracts.sorted("id")
+        self.env["ir.config_parameter"].sudo().set_param("contract.cron.batch_size", 2)
+        # Simulate a run killed after the first two contracts
+        date_ref = fields.Date.context_today(self.contract)
+        self.env["contract.contract"]._set_cron_cursor(
+            date_ref, "invoice", contracts[1]
+        )
+        self.env["contract.contract"].cron_recurring_create_invoice(date_ref)
+        for contract in contracts[:2]:
+            self.assertFalse(contract._get_related_invoices())
+        for contract in contracts[2:]:
+            self.assertTrue(contract._get_related_invoices())
+
+    def test_cron_recurring_create_invoice_shard(self):
+        self.acct_line.date_start = "2018-01-01"
+        self.acct_line.recurring_invoicing_type = "post-paid"
+        self.acct_line.date_end = "2018-03-15"
+        contracts = self.contract
+        for _i in range(6):
+            contracts |= self.contract.copy()
+        self.env["ir.config_parameter"].sudo().set_param("contract.cron.shard_count", 3)
+        self.assertEqual(contracts._lock_for_cron(), contracts)
+        date_ref = fields.Date.context_today(self.contract)
+        for shard in range(3):
+            self.env["contract.contract"].cron_recurring_create_invoice_shard(
+                shard, date_ref
+            )
+        for contract in contracts:
+            self.assertEqual(len(contract._get_related_invoices()), 1)
+        with self.assertRaises(ValidationError):
+            self.env["contract.contract"].cron_recurring_create_invoice_shard(
+                3, date_ref
+            )
+
+    def test_cron_recurring_create_invoice_locked(self):
+        self.acct_line.date_start = "2018-01-01"
+        self.acct_line.recurring_invoicing_type = "post-paid"
+        self.acct_line.date_end = "2018-03-15"
+        contracts = self.env["contract.contract"]
+        for _i in range(4):
+            contracts |= self.contract.copy()
+        contracts = contracts.sorted("id")
+        self.env["ir.config_parameter"].sudo().set_param("contract.cron.batch_size", 2)
+        date_ref = fields.Date.context_today(self.contract)
+        # The first contract is held by a concurrent worker
+        contract_cls = self.env.registry["contract.contract"]
+        original_lock = contract_cls._lock_for_cron
+        cursors = []
+
+        def lock_for_cron(records):
+            cursors.append(records._get_cron_cursor(date_ref, "invoice"))
+            return original_lock(records) - contracts[0]
+
+        with mock.patch.object(contract_cls, "_lock_for_cron", lock_for_cron):
+            self.env["contract.contract"].cron_recurring_create_invoice(date_ref)
+        # The resume marker did not move past the skipped contract, which is
+        # left due for the next run
+        for cursor in cursors:
+            self.assertTrue(not cursor or cursor[1] < contracts[0].id)
+        self.assertFalse(contracts[0]._get_related_invoices())
+        for contract in contracts[1:]:
+            self.assertEqual(len(contract._get_related_invoices()), 1)
+        self.env["contract.contract"].cron_recurring_create_invoice(date_ref)
+        self.assertEqual(len(contracts[0]._get_related_invoices()), 1)
+
+    def test_lock_for_cron_serialization_failure(self):
+        contracts = self.contract | self.contract2
+        original_execute = type(self.env.cr).execute
+
+        def execute(cr, query, *args, **kwargs):
+            if "FOR UPDATE" in str(query):
+                raise SerializationFailure()
+            return original_execute(cr, query, *args, **kwargs)
+
+        with mock.patch.object(type(self.env.cr), "execute", execute):
+            self.assertFalse(contracts._lock_for_cron())
+        # The transaction is still usable
+        self.assertEqual(contracts._lock_for_cron(), contracts)
+
+    def test_simulate_recurring_create_invoice(self):
+        self.acct_line.date_start = "2018-01-01"
+        self.acct_line.recurring_invoicing_type = "post-paid"
+        self.acct_line.date_end = "2018-03-15"
+        last_date_invoiced = self.acct_line.last_date_invoiced
+        date_ref = fields.Date.context_today(self.contract)
+        result = self.env["contract.contract"].simulate_recurring_create_invoice(
+            date_ref
+        )
+        line_ids = [
+            command[2].get("contract_line_id")
+            for vals in result["invoices_values"]
+            for command in vals["invoice_line_ids"]
+        ]
+        self.assertIn(self.acct_line.id, line_ids)
+        self.assertEqual(set(result["stages"]), {"search", "lines", "prepare"})
+        self.assertEqual(
+            result["stages"]["prepare"]["records"], len(result["invoices_values"])
+        )
+        self.assertFalse(self.contract._get_related_invoices())
+        self.assertEqual(self.acct_line.last_date_invoiced, last_date_invoiced)
+        exported = json.loads(
+            self.env["contract.contract"].simulate_recurring_create_invoice(
+                date_ref, as_json=True
+            )
+        )
+        self.assertEqual(exported["date_ref"], str(date_ref))
+        self.assertEqual(
+            len(exported["invoices_values"]), len(result["invoices_values"])
+        )
+
+    def test_cron_recurring_create_invoice_instrumented(self):
+        self.acct_line.date_start = "2018-01-01"
+        self.acct_line.recurring_invoicing_type = "post-paid"
+        self.acct_line.date_end = "2018-03-15"
+        self.env["ir.config_parameter"].sudo().set_param(
+            "contract.invoicing.instrumentation", "True"
+        )
+        with self.assertLogs("odoo.addons.contract.models.contract") as logs:
+            self.env["contract.contract"].cron_recurring_create_invoice()
+        self.assertTrue(
+            any("Contract invoicing stage" in output for output in logs.output)
+        )
+        run = self.env["contract.invoicing.run"].search([], limit=1)
+        self.assertTrue(run.contract_count)
+        self.assertEqual(run.batch_count, len(set(run.stage_ids.mapped("batch"))))
+        self.assertEqual(
+            set(run.stage_ids.mapped("name")),
+            {
+                "prepare",
+                "create",
+                "add_contract_origin",
+                "invoice_followers",
+                "compute_recurring_next_date",
+            },
+        )
+        self.assertTrue(self.contract._get_related_invoices())
+        self.assertGreaterEqual(
+            run.document_count, len(self.contract._get_related_invoices())
+        )
+
     def test_get_period_to_invoice_monthlylastday_postpaid(self):
         self.acct_line.date_start = "2018-01-05"
         self.acct_line.recurring_invoicing_type = "post-paid"
@@ -1384,6 +1871,25 @@ class TestContract(TestContractBase):
         action = self.contract.action_show_invoices()
         self.assertEqual(set(action["domain"][0][2]), set(invoices.ids))
 
+    def test_related_invoices_map(self):
+        invoices = self.contract.recurring_create_invoice()
+        invoices |= self.contract.recurring_create_invoice()
+        invoices2 = self.contract2.recurring_create_invoice()
+        contracts = self.contract | self.contract2 | self.contract3
+        invoices_map = contracts._get_related_invoices_map()
+        self.assertEqual(invoices_map[self.contract.id], invoices)
+        self.assertEqual(invoices_map[self.contract2.id], invoices2)
+        self.assertFalse(invoices_map[self.contract3.id])
+        contracts.invalidate_recordset(["invoice_count"])
+        self.assertEqual(contracts.mapped("invoice_count"), [2, 1, 0])
+
+    def test_contract_count_invoice_new_record(self):
+        contract = self.env["contract.contract"].new(
+            {"name": "Test new contract", "partner_id": self.partner.id}
+        )
+        self.assertEqual(contract.invoice_count, 0)
+        self.assertFalse(contract._get_related_invoices())
+
     def test_compute_create_invoice_visibility(self):
         self.assertTrue(self.contract.create_invoice_visibility)
         self.acct_line.write(
@@ -1518,3 +2024,143 @@ class TestContract(TestContractBase):
         self.contract3.contract_line_ids.recurring_next_date = fields.Date.today()
         invoice_id = self.contract3.recurring_create_invoice()
         self.assertEqual(invoice_id.invoice_line_ids[0].name, "Header for May Services")
+
+    def test_insert_markers_batch(self):
+        lines = self.contract3.contract_line_ids
+        periods = [(to_date("2023-05-01"), to_date("2023-05-31"))] * len(lines)
+        names = lines._insert_markers_batch(periods)
+        self.assertEqual(
+            names,
+            [line._insert_markers(*periods[0]) for line in lines],
+        )
+        self.assertEqual(names[0], "Header for May Services")
+        self.assertEqual(names[1], "Services from 05/01/2023 to 05/31/2023")
+        self.assertEqual(names[2], "Line")
+        # Language data is cached: rendering again doesn't hit the database
+        with self.assertQueryCount(0):
+            lines._insert_markers_batch(periods)
+
+    def test_insert_markers_batch_invoice(self):
+        contract_line_cls = self.env.registry["contract.line"]
+        with (
+            mock.patch.object(
+                contract_line_cls,
+                "_insert_markers_batch",
+                autospec=True,
+                side_effect=contract_line_cls._insert_markers_batch,
+            ) as batch,
+            mock.patch.object(
+                contract_line_cls,
+                "_insert_markers",
+                autospec=True,
+                side_effect=contract_line_cls._insert_markers,
+            ) as single,
+        ):
+            invoice = self.contract.recurring_create_invoice()
+        self.assertEqual(batch.call_count, 1)
+        self.assertFalse(single.called)
+        self.assertEqual(
+            invoice.invoice_line_ids.name, "Services from 01/01/2018 to 01/31/2018"
+        )
+
+    def test_update_last_date_invoiced_grouped(self):
+        lines = self.contract3.contract_line_ids
+        period_date_end = lines[0].next_period_date_end
+        self.assertTrue(all(lines.mapped("next_period_date_end")))
+        contract_line_cls = self.env.registry["contract.line"]
+        original_write = contract_line_cls.write
+        written = []
+
+        def write(records, vals):
+            written.append(records.ids)
+            return original_write(records, vals)
+
+        with mock.patch.object(contract_line_cls, "write", write):
+            lines._update_last_date_invoiced()
+        self.assertEqual(written, [lines.ids])
+        self.assertEqual(set(lines.mapped("last_date_invoiced")), {period_date_end})
+
+    def test_recurring_create_index(self):
+        domain = expression.AND(
+            [
+                self.env["contract.contract"]._get_contracts_to_invoice_domain(
+                    self.today
+                ),
+                [("generation_type", "=", "invoice")],
+            ]
+        )
+        self.assertIn(
+            "contract_contract_recurring_create_index",
+            self._explain("contract.contract", domain),
+        )
+        self.assertIn(
+            "account_move_line__contract_line_id_index",
+            self._explain(
+                "account.move.line", [("contract_line_id", "in", self.acct_line.ids)]
+            ),
+        )
+
+    def test_prepare_invoice_journal_resolution(self):
+        company = self.contract.company_id
+        purchase_journal = self.env["account.journal"].search(
+            [("type", "=", "purchase"), ("company_id", "=", company.id)], limit=1
+        )
+        sale_journal = self.env["account.journal"].search(
+            [("type", "=", "sale"), ("company_id", "=", company.id)], limit=1
+        )
+        contracts = self.contract | self.contract.copy()
+        contracts.journal_id = purchase_journal
+        resolution = {}
+        invoices_values = contracts.with_context(
+            contract_invoice_resolution=resolution
+        )._prepare_recurring_invoices_values()
+        self.assertEqual(len(invoices_values), 2)
+        self.assertEqual(
+            {vals["journal_id"] for vals in invoices_values}, {sale_journal.id}
+        )
+        self.assertEqual(
+            resolution[("journal", company.id, "sale")],
+            sale_journal,
+        )
+
+    def test_portal_search_count_cache(self):
+        contract_model = self.env["contract.contract"]
+        contract_cls = self.env.registry["contract.contract"]
+        original_search_count = contract_cls.search_count
+        counted = []
+
+        def search_count(records, domain, limit=None):
+            counted.append(domain)
+            return original_search_count(records, domain, limit=limit)
+
+        domain = [("partner_id", "=", self.partner.id)]
+        with mock.patch.object(contract_cls, "search_count", search_count):
+            count = contract_model._portal_search_count(domain)
+            # The second call is served by the cache
+            self.assertEqual(contract_model._portal_search_count(domain), count)
+            self.assertEqual(len(counted), 1)
+            # Writing a contract drops the cached counters
+            self.contract.name = "Renamed contract"
+            self.assertEqual(contract_model._portal_search_count(domain), count)
+            self.assertEqual(len(counted), 2)
+            # So does creating one
+            self.contract.copy()
+            self.assertEqual(contract_model._portal_search_count(domain), count + 1)
+            self.assertEqual(len(counted), 3)
+            # The counters are cached per user
+            contract_model.with_user(
+                self.env.ref("base.user_admin")
+            )._portal_search_count(domain)
+            self.assertEqual(len(counted), 4)
+            # A zero TTL disables the cache
+            self.env["ir.config_parameter"].sudo().set_param(
+                "contract.portal.counter_ttl", 0
+            )
+            contract_model._portal_search_count(domain)
+            contract_model._portal_search_count(domain)
+            self.assertEqual(len(counted), 6)
+
+    def test_create_access_token(self):
+        contracts = self.contract | self.contract.copy()
+        self.assertTrue(all(contracts.mapped("access_token")))
+        self.assertNotEqual(contracts[0].access_token, contracts[1].access_token)
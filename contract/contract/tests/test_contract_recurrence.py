@@ -0,0 +1,212 @@
+# Copyright 2026 ACSONE SA/NV
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+
+import random
+from datetime import date, timedelta
+from unittest import mock
+
+from dateutil.relativedelta import relativedelta
+
+from odoo.tests import common
+
+RULE_TYPES = [
+    "daily",
+    "weekly",
+    "monthly",
+    "monthlylastday",
+    "quarterly",
+    "semesterly",
+    "yearly",
+]
+
+
+def reference_relative_delta(recurring_rule_type, interval):
+    if recurring_rule_type == "daily":
+        return relativedelta(days=interval)
+    elif recurring_rule_type == "weekly":
+        return relativedelta(weeks=interval)
+    elif recurring_rule_type == "monthly":
+        return relativedelta(months=interval)
+    elif recurring_rule_type == "monthlylastday":
+        return relativedelta(months=interval, day=1)
+    elif recurring_rule_type == "quarterly":
+        return relativedelta(months=3 * interval)
+    elif recurring_rule_type == "semesterly":
+        return relativedelta(months=6 * interval)
+    else:
+        return relativedelta(years=interval)
+
+
+def reference_next_period_date_end(
+    next_period_date_start,
+    recurring_rule_type,
+    recurring_interval,
+    max_date_end,
+    next_invoice_date=False,
+    recurring_invoicing_type=False,
+    recurring_invoicing_offset=False,
+):
+    """relativedelta based implementation the engine must stay equal to"""
+    if not next_period_date_start or (
+        max_date_end and next_period_date_start > max_date_end
+    ):
+        return False
+    if not next_invoice_date:
+        next_period_date_end = (
+            next_period_date_start
+            + reference_relative_delta(recurring_rule_type, recurring_interval)
+            - relativedelta(days=1)
+        )
+    elif recurring_invoicing_type == "pre-paid":
+        next_period_date_end = (
+            next_invoice_date
+            - relativedelta(days=recurring_invoicing_offset)
+            + reference_relative_delta(recurring_rule_type, recurring_interval)
+            - relativedelta(days=1)
+        )
+    else:
+        next_period_date_end = next_invoice_date - relativedelta(
+            days=recurring_invoicing_offset
+        )
+    if max_date_end and next_period_date_end > max_date_end:
+        next_period_date_end = max_date_end
+    return next_period_date_end
+
+
+def reference_next_invoice_date(
+    next_period_date_start,
+    recurring_invoicing_type,
+    recurring_invoicing_offset,
+    recurring_rule_type,
+    recurring_interval,
+    max_date_end,
+):
+    next_period_date_end = reference_next_period_date_end(
+        next_period_date_start,
+        recurring_rule_type,
+        recurring_interval,
+        max_date_end=max_date_end,
+    )
+    if not next_period_date_end:
+        return False
+    if recurring_invoicing_type == "pre-paid":
+        return next_period_date_start + relativedelta(days=recurring_invoicing_offset)
+    return next_period_date_end + relativedelta(days=recurring_invoicing_offset)
+
+
+class TestContractRecurrence(common.TransactionCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.mixin = cls.env["contract.recurring.mixin"]
+
+    def _random_date(self, rng):
+        # Bias towards month ends, where clamping happens
+        if rng.random() < 0.3:
+            first = date(rng.randint(1999, 2040), rng.randint(1, 12), 1)
+            return first + relativedelta(day=31) - timedelta(days=rng.randint(0, 3))
+        return date(2000, 1, 1) + timedelta(days=rng.randint(0, 15000))
+
+    def _random_cases(self, count, seed):
+        rng = random.Random(seed)
+        for _i in range(count):
+            yield (
+                self._random_date(rng) if rng.random() > 0.05 else False,
+                rng.choice(RULE_TYPES),
+                rng.randint(0, 13),
+                rng.choice(["pre-paid", "post-paid"]),
+                rng.randint(0, 3),
+                self._random_date(rng) if rng.random() < 0.4 else False,
+                self._random_date(rng) if rng.random() < 0.3 else False,
+            )
+
+    def test_scalar_equivalence(self):
+        """Property: the scalar methods match the relativedelta implementation
+        for random recurrence parameters"""
+        for case in self._random_cases(5000, seed=2026):
+            start, rule, interval, invoicing_type, offset, max_end, forced = case
+            self.assertEqual(
+                self.mixin.get_next_period_date_end(
+                    start,
+                    rule,
+                    interval,
+                    max_end,
+                    next_invoice_date=forced,
+                    recurring_invoicing_type=invoicing_type,
+                    recurring_invoicing_offset=offset,
+                ),
+                reference_next_period_date_end(
+                    start, rule, interval, max_end, forced, invoicing_type, offset
+                ),
+                case,
+            )
+            self.assertEqual(
+                self.mixin.get_next_invoice_date(
+                    start, invoicing_type, offset, rule, interval, max_end
+                ),
+                reference_next_invoice_date(
+                    start, invoicing_type, offset, rule, interval, max_end
+                ),
+                case,
+            )
+
+    def test_batch_equivalence(self):
+        """Property: one batch call returns the same dates as the reference
+        implementation called case by case"""
+        cases = list(self._random_cases(5000, seed=18))
+        period_date_ends, invoice_dates = self.mixin.get_next_periods(
+            *[list(column) for column in zip(*cases, strict=True)]
+        )
+        for case, period_date_end, invoice_date in zip(
+            cases, period_date_ends, invoice_dates, strict=True
+        ):
+            start, rule, interval, invoicing_type, offset, max_end, forced = case
+            self.assertEqual(
+                period_date_end,
+                reference_next_period_date_end(
+                    start, rule, interval, max_end, forced, invoicing_type, offset
+                ),
+                case,
+            )
+            self.assertEqual(
+                invoice_date,
+                reference_next_invoice_date(
+                    start, invoicing_type, offset, rule, interval, max_end
+                ),
+                case,
+            )
+
+    def test_month_end_clamping(self):
+        period_date_ends, invoice_dates = self.mixin.get_next_periods(
+            [date(2024, 1, 31), date(2024, 1, 31), date(2023, 2, 15)],
+            ["monthly", "monthlylastday", "monthlylastday"],
+            [1, 1, 1],
+            ["pre-paid", "post-paid", "post-paid"],
+            [0, 0, 0],
+            [False, False, False],
+        )
+        self.assertEqual(
+            period_date_ends, [date(2024, 2, 28), date(2024, 1, 31), date(2023, 2, 28)]
+        )
+        self.assertEqual(
+            invoice_dates, [date(2024, 1, 31), date(2024, 1, 31), date(2023, 2, 28)]
+        )
+
+    def test_overridden_scalar_methods(self):
+        """The batch computation goes through the scalar methods when a model
+        overrides them"""
+        line_model = self.env["contract.line"]
+        line_cls = type(line_model)
+        forced_date = date(2030, 1, 1)
+
+        def get_next_invoice_date(records, *args, **kwargs):
+            return forced_date
+
+        with mock.patch.object(
+            line_cls, "get_next_invoice_date", get_next_invoice_date
+        ):
+            period_date_ends, invoice_dates = line_model.get_next_periods(
+                [date(2024, 1, 1)], ["monthly"], [1], ["pre-paid"], [0], [False]
+            )
+        self.assertEqual(period_date_ends, [date(2024, 1, 31)])
+        self.assertEqual(invoice_dates, [forced_date])
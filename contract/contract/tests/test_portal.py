@@ -26,5 +26,34 @@ class TestContractPortal(HttpCase):
             f"/my/contracts/{contract.id}?access_token={contract.access_token}"
         )
         self.assertEqual(self.url_open(url=url_contract).status_code, 200)
+        response = self.url_open(url=f"{url_contract}&report_type=html")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(contract.name, response.text)
         contract.message_unsubscribe(partner_ids=user_portal.partner_id.ids)
         self.assertEqual(self.url_open(url=url_contract).status_code, 200)
+
+    def test_contract_without_token(self):
+        # The portal pages are read-only and can't generate a missing token
+        partner = self.env["res.partner"].create({"name": "partner test contract"})
+        contract = self.env["contract.contract"].create(
+            {"name": "Test Contract", "partner_id": partner.id}
+        )
+        user_portal = self.env.ref("base.demo_user0")
+        contract.message_subscribe(partner_ids=user_portal.partner_id.ids)
+        self.env.cr.execute(
+            "UPDATE contract_contract SET access_token = NULL WHERE id = %s",
+            [contract.id],
+        )
+        contract.invalidate_recordset(["access_token"])
+        self.authenticate("portal", "portal")
+        response = self.url_open(url="/my/contracts")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'href="/my/contracts/{contract.id}"', response.text)
+        response = self.url_open(url=f"/my/contracts/{contract.id}")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            f'href="/my/contracts/{contract.id}?report_type=pdf&amp;download=true"',
+            response.text,
+        )
+        contract.invalidate_recordset(["access_token"])
+        self.assertFalse(contract.access_token)
@@ -0,0 +1,19 @@
+# Copyright 2026 ACSONE SA/NV
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+
+{
+    "name": "Contract Benchmark",
+    "summary": "Synthetic data generator and timed scenarios for contracts",
+    "version": "18.0.1.0.0",
+    "category": "Contract Management",
+    "license": "AGPL-3",
+    "author": "ACSONE SA/NV, Odoo Community Association (OCA)",
+    "website": "https://github.com/OCA/contract",
+    "depends": [
+        "contract_forecast",
+        "contract_price_revision",
+        "contract_variable_quantity",
+    ],
+    "development_status": "Alpha",
+    "installable": True,
+}
@@ -0,0 +1,260 @@
+# Copyright 2026 ACSONE SA/NV
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+
+import logging
+import platform
+import random
+import time
+import tracemalloc
+
+from dateutil.relativedelta import relativedelta
+
+from odoo import Command, api, fields, models, release
+from odoo.exceptions import AccessError
+
+_logger = logging.getLogger(__name__)
+
+RULE_TYPES = [
+    "daily",
+    "weekly",
+    "monthly",
+    "monthlylastday",
+    "quarterly",
+    "semesterly",
+    "yearly",
+]
+
+
+class ContractBenchmark(models.AbstractModel):
+    _name = "contract.benchmark"
+    _description = "Contract Benchmark"
+
+    @api.model
+    def _get_scenarios(self):
+        """Return the timed scenarios, as an ordered mapping of their name
+        to the method running them on the generated contracts.
+        """
+        return {
+            "recurring_create_invoice": self._scenario_recurring_create_invoice,
+            "renew_contract_line": self._scenario_renew_contract_line,
+            "generate_forecast_periods": self._scenario_generate_forecast_periods,
+            "price_revision": self._scenario_price_revision,
+        }
+
+    @api.model
+    def _generate_data(self, partners=10, contracts=100, lines=5, seed=42):
+        """Create a reproducible set of contracts.
+
+        Every contract gets a section, then ``lines`` lines mixing the
+        recurrence rules, variable quantities, notes, auto-renewed lines and
+        lines with a planned successor.
+
+        :return: the created contracts
+        """
+        rng = random.Random(seed)
+        today = fields.Date.context_today(self)
+        product = self.env["product.product"].create(
+            {"name": "Benchmark service", "type": "service", "list_price": 10.0}
+        )
+        formula = self.env["contract.line.qty.formula"].create(
+            {"name": "Benchmark formula", "code": "result = quantity * 2"}
+        )
+        partner_ids = (
+            self.env["res.partner"]
+            .create([{"name": f"Benchmark partner {i}"} for i in range(partners or 1)])
+            .ids
+        )
+        contracts_values = []
+        for i in range(contracts):
+            line_commands = [
+                Command.create({"display_type": "line_section", "name": "Services"})
+            ]
+            for j in range(lines):
+                line_commands.append(
+                    Command.create(self._prepare_line_values(rng, product, formula))
+                )
+                if j % 4 == 3:
+                    line_commands.append(
+                        Command.create(
+                            {
+                                "display_type": "line_note",
+                                "name": "Benchmark note",
+                                "note_invoicing_mode": "with_previous_line",
+                            }
+                        )
+                    )
+            contracts_values.append(
+                {
+                    "name": f"Benchmark contract {i}",
+                    "partner_id": rng.choice(partner_ids),
+                    "line_recurrence": True,
+                    "contract_line_ids": line_commands,
+                }
+            )
+        new_contracts = self.env["contract.contract"].create(contracts_values)
+        # Successor chains on the lines with an end date
+        to_chain = new_contracts.contract_line_ids.filtered(
+            lambda line: not line.display_type
+            and line.date_end
+            and not line.is_auto_renew
+            and line.date_end < today
+        )
+        for line in to_chain:
+            date_start = line.date_end + relativedelta(days=1)
+            line.plan_successor(
+                date_start,
+                date_start + relativedelta(years=1, days=-1),
+                False,
+                post_message=False,
+            )
+        return new_contracts
+
+    @api.model
+    def _prepare_line_values(self, rng, product, formula):
+        today = fields.Date.context_today(self)
+        date_start = today - relativedelta(months=rng.randint(0, 12))
+        values = {
+            "product_id": product.id,
+            "name": "Service from #START# to #END#",
+            "quantity": rng.randint(1, 10),
+            "uom_id": product.uom_id.id,
+            "price_unit": rng.randint(1, 1000),
+            "date_start": date_start,
+            "recurring_rule_type": rng.choice(RULE_TYPES),
+            "recurring_interval": rng.randint(1, 3),
+            "recurring_invoicing_type": rng.choice(["pre-paid", "post-paid"]),
+        }
+        if rng.random() < 0.2:
+            values.update({"qty_type": "variable", "qty_formula_id": formula.id})
+        kind = rng.random()
+        if kind < 0.2:
+            # Auto renewed line, due for renewal
+            date_end = today + relativedelta(days=rng.randint(-30, 15))
+            values.update(
+                {
+                    "date_start": date_end - relativedelta(years=1, days=-1),
+                    "date_end": date_end,
+                    "is_auto_renew": True,
+                    "auto_renew_rule_type": "yearly",
+                    "auto_renew_interval": 1,
+                }
+            )
+        elif kind < 0.4:
+            # Finished line, gets a successor
+            values["date_end"] = date_start + relativedelta(months=1)
+        return values
+
+    @api.model
+    def _measure(self, name, func):
+        """Run ``func`` and return its wall time, query count and the peak
+        of the memory allocated by Python while running it.
+        """
+        self.env.flush_all()
+        tracemalloc.start()
+        queries = self.env.cr.sql_log_count
+        start = time.perf_counter()
+        try:
+            records = func()
+            self.env.flush_all()
+        finally:
+            duration = time.perf_counter() - start
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        result = {
+            "name": name,
+            "duration": duration,
+            "queries": self.env.cr.sql_log_count - queries,
+            "peak_memory": peak_memory,
+            "records": records if isinstance(records, int) else len(records or []),
+        }
+        _logger.info(
+            "Contract benchmark %(name)s: %(duration).3fs, %(queries)d queries, "
+            "%(peak_memory)d bytes, %(records)d records",
+            result,
+        )
+        return result
+
+    @api.model
+    def _scenario_recurring_create_invoice(self, contracts):
+        date_ref = fields.Date.context_today(self)
+        self.env["contract.contract"].cron_recurring_create_invoice(date_ref)
+        return self.env["account.move"].search_count(
+            [("invoice_line_ids.contract_line_id.contract_id", "in", contracts.ids)]
+        )
+
+    @api.model
+    def _scenario_renew_contract_line(self, contracts):
+        to_renew = self.env["contract.line"].search(
+            self.env["contract.line"]._contract_line_to_renew_domain()
+            + [("contract_id", "in", contracts.ids)]
+        )
+        self.env["contract.line"].cron_renew_contract_line()
+        return to_renew
+
+    @api.model
+    def _scenario_generate_forecast_periods(self, contracts):
+        contracts.company_id.write({"enable_contract_forecast": True})
+        lines = contracts.contract_line_ids.filtered(lambda line: not line.display_type)
+        lines._generate_forecast_periods()
+        return lines.forecast_period_ids
+
+    @api.model
+    def _scenario_price_revision(self, contracts):
+        wizard = (
+            self.env["contract.price.revision.wizard"]
+            .with_context(active_ids=contracts.ids)
+            .create(
+                {
+                    "date_start": fields.Date.context_today(self)
+                    + relativedelta(months=1),
+                    "variation_percent": 5.0,
+                }
+            )
+        )
+        lines = wizard._get_contract_lines_to_revise(contracts)
+        wizard.action_apply()
+        return lines
+
+    @api.model
+    def _run(self, partners=10, contracts=100, lines=5, seed=42, scenarios=None):
+        """Generate the data and run the scenarios on it, in order.
+
+        Reserved to the superuser: run it from a shell or a test on a
+        disposable database, nothing is committed here.
+
+        :param scenarios: names of the scenarios to run, all by default
+        :return: dictionary of the results
+        """
+        if not self.env.is_superuser():
+            raise AccessError(
+                self.env._("The contract benchmark can only be run by the superuser.")
+            )
+        available = self._get_scenarios()
+        results = {
+            "parameters": {
+                "partners": partners,
+                "contracts": contracts,
+                "lines": lines,
+                "seed": seed,
+            },
+            "environment": {
+                "odoo": release.version,
+                "python": platform.python_version(),
+            },
+            "scenarios": [],
+        }
+        generated = self.env["contract.contract"]
+
+        def generate():
+            nonlocal generated
+            generated = self._generate_data(partners, contracts, lines, seed)
+            return generated.contract_line_ids
+
+        results["generate_data"] = self._measure("generate_data", generate)
+        for name in scenarios or available:
+            results["scenarios"].append(
+                self._measure(
+                    name, lambda scenario=available[name]: scenario(generated)
+                )
+            )
+        return results
@@ -0,0 +1,41 @@
+# Copyright 2026 ACSONE SA/NV
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+
+from odoo.exceptions import AccessError
+from odoo.tests.common import TransactionCase, new_test_user
+
+
+class TestContractBenchmark(TransactionCase):
+    def test_generate_data(self):
+        benchmark = self.env["contract.benchmark"]
+        contracts = benchmark._generate_data(partners=3, contracts=5, lines=4, seed=1)
+        self.assertEqual(len(contracts), 5)
+        lines = contracts.contract_line_ids
+        self.assertTrue(lines.filtered(lambda line: line.display_type))
+        self.assertGreaterEqual(
+            len(lines.filtered(lambda line: not line.display_type)), 5 * 4
+        )
+        # Same seed, same data
+        other = benchmark._generate_data(partners=3, contracts=5, lines=4, seed=1)
+        self.assertEqual(
+            contracts.contract_line_ids.mapped("recurring_rule_type"),
+            other.contract_line_ids.mapped("recurring_rule_type"),
+        )
+
+    def test_run(self):
+        results = self.env["contract.benchmark"]._run(
+            partners=2, contracts=3, lines=4, seed=7
+        )
+        self.assertEqual(
+            [scenario["name"] for scenario in results["scenarios"]],
+            list(self.env["contract.benchmark"]._get_scenarios()),
+        )
+        for scenario in results["scenarios"]:
+            self.assertGreater(scenario["queries"], 0)
+            self.assertGreaterEqual(scenario["duration"], 0)
+            self.assertGreater(scenario["peak_memory"], 0)
+
+    def test_run_superuser_only(self):
+        user = new_test_user(self.env, login="benchmark", groups="base.group_system")
+        with self.assertRaises(AccessError):
+            self.env["contract.benchmark"].with_user(user)._run(contracts=1)
@@ -21,7 +21,7 @@ class ContractLine(models.Model):
     ):
         self.ensure_one()
         return {
-            "name": self._insert_markers(period_date_start, period_date_end),
+            "name": self._get_period_name(period_date_start, period_date_end),
             "contract_id": self.contract_id.id,
             "company_id": self.contract_id.company_id.id,
             "contract_line_id": self.id,
@@ -59,8 +59,13 @@ class ContractLine(models.Model):
         )
 
     def _generate_forecast_periods(self):
-        values = []
-        for rec in self:
+        # Collect the periods first, so that their names are rendered in one
+        # batch before preparing the values
+        lines = self
+        if "contract_invoice_resolution" not in self.env.context:
+            lines = self.with_context(contract_invoice_resolution={})
+        periods = []
+        for rec in lines:
             rec.forecast_period_ids.unlink()
             if rec.recurring_next_date:
                 period_date_start = rec.next_period_date_start
@@ -71,12 +76,14 @@ class ContractLine(models.Model):
                     period_date_end
                 ):
                     if period_date_end and recurring_next_date:
-                        new_vals = rec._prepare_contract_line_forecast_period(
-                            period_date_start,
-                            period_date_end,
-                            recurring_next_date,
+                        periods.append(
+                            (
+                                rec,
+                                period_date_start,
+                                period_date_end,
+                                recurring_next_date,
+                            )
                         )
-                        values.append(new_vals)
                     period_date_start = period_date_end + relativedelta(days=1)
                     period_date_end = self.get_next_period_date_end(
                         period_date_start,
@@ -92,7 +99,13 @@ class ContractLine(models.Model):
                         rec.recurring_interval,
                         max_date_end=max_date_end,
                     )
-
+        lines.concat(*[period[0] for period in periods])._memoize_period_names(
+            [period[1:3] for period in periods]
+        )
+        values = [
+            rec._prepare_contract_line_forecast_period(*dates)
+            for rec, *dates in periods
+        ]
         return self.env["contract.line.forecast.period"].create(values)
 
     @api.model_create_multi
@@ -1,6 +1,8 @@
 # Copyright 2019 ACSONE SA/NV
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
 
+from unittest import mock
+
 from dateutil.relativedelta import relativedelta
 
 from odoo.fields import Date
@@ -271,3 +273,28 @@ class TestContractLineForecastPeriod(TestContractBase):
         self.acct_line.write({"date_end": False})
         self.assertTrue(self.acct_line.forecast_period_ids)
         self.assertEqual(len(self.acct_line.forecast_period_ids), 36)
+
+    def test_forecast_period_names_batch(self):
+        self.acct_line.write(
+            {
+                "date_start": f"{self.this_year}-01-01",
+                "recurring_next_date": f"{self.this_year}-01-01",
+                "date_end": f"{self.this_year}-12-31",
+                "recurring_rule_type": "monthly",
+                "recurring_invoicing_type": "pre-paid",
+            }
+        )
+        contract_line_cls = self.env.registry["contract.line"]
+        with mock.patch.object(
+            contract_line_cls,
+            "_insert_markers",
+            autospec=True,
+            side_effect=contract_line_cls._insert_markers,
+        ) as single:
+            periods = self.acct_line._generate_forecast_periods()
+        self.assertFalse(single.called)
+        self.assertEqual(len(periods), 12)
+        self.assertEqual(
+            periods[0].name,
+            f"Services from 01/01/{self.this_year} to 01/31/{self.this_year}",
+        )
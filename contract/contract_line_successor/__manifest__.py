@@ -3,7 +3,7 @@
 
 {
     "name": "Contract Line Successor",
-    "version": "18.0.1.0.1",
+    "version": "18.0.1.2.0",
     "license": "AGPL-3",
     "author": "ACSONE SA/NV,Odoo Community Association (OCA)",
     "website": "https://github.com/OCA/contract",
@@ -17,6 +17,7 @@
         "views/contract_contract.xml",
         "views/contract_template_line.xml",
         "views/contract_line.xml",
+        "views/contract_line_mass_operation.xml",
         "wizards/contract_line_wizard.xml",
         "views/res_config_settings.xml",
     ],
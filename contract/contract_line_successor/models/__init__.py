@@ -1,5 +1,6 @@
 from . import contract_contract
 from . import contract_line
+from . import contract_line_mass_operation
 from . import contract_template
 from . import contract_template_line
 from . import res_company
@@ -18,8 +18,3 @@ class ContractContract(models.Model):
             ).mapped("date_end")
             if date_end and all(date_end):
                 contract.date_end = max(date_end)
-
-    def _convert_contract_lines(self, contract):
-        new_lines = super()._convert_contract_lines(contract)
-        new_lines._onchange_is_auto_renew()
-        return new_lines
@@ -1,6 +1,10 @@
 # Copyright 2025 ACSONE SA/NV
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
 
+import json
+import logging
+import time
+from collections import defaultdict
 from datetime import timedelta
 
 from dateutil.relativedelta import relativedelta
@@ -8,8 +12,19 @@ from markupsafe import Markup
 
 from odoo import _, api, fields, models
 from odoo.exceptions import ValidationError
+from odoo.osv import expression
+from odoo.tools import SQL, create_index, split_every
 
-from .contract_line_constraints import get_allowed
+from odoo.addons.contract.models import contract_recurrence
+
+from .contract_line_constraints import (
+    ALLOWED_TABLE,
+    NOT_ALLOWED,
+    compute_when,
+    criteria_mask,
+)
+
+_logger = logging.getLogger(__name__)
 
 
 class ContractLine(models.Model):
@@ -68,9 +83,20 @@ class ContractLine(models.Model):
             ("canceled", "Canceled"),
         ],
         compute="_compute_state",
-        search="_search_state",
+        store=True,
+        index=True,
     )
 
+    def init(self):
+        # Serves _contract_line_to_renew_domain
+        create_index(
+            self.env.cr,
+            "contract_line_to_renew_index",
+            self._table,
+            ["termination_notice_date", "is_canceled"],
+            where="is_auto_renew",
+        )
+
     @api.depends(
         "date_end",
         "termination_notice_rule_type",
@@ -96,38 +122,46 @@ class ContractLine(models.Model):
         "is_canceled",
     )
     def _compute_allowed(self):
-        for rec in self:
+        for rec, allowed in zip(self, self._get_allowed(), strict=True):
+            allowed = allowed or NOT_ALLOWED
             rec.update(
                 {
-                    "is_plan_successor_allowed": False,
-                    "is_stop_plan_successor_allowed": False,
-                    "is_stop_allowed": False,
-                    "is_cancel_allowed": False,
-                    "is_un_cancel_allowed": False,
+                    "is_plan_successor_allowed": allowed.plan_successor,
+                    "is_stop_plan_successor_allowed": allowed.stop_plan_successor,
+                    "is_stop_allowed": allowed.stop,
+                    "is_cancel_allowed": allowed.cancel,
+                    "is_un_cancel_allowed": allowed.uncancel,
                 }
             )
-            if rec.date_start:
-                allowed = get_allowed(
-                    rec.date_start,
-                    rec.date_end,
-                    rec.last_date_invoiced,
-                    rec.is_auto_renew,
-                    rec.successor_contract_line_id,
-                    rec.predecessor_contract_line_id,
-                    rec.is_canceled,
-                )
-                if allowed:
-                    rec.update(
-                        {
-                            "is_plan_successor_allowed": allowed.plan_successor,
-                            "is_stop_plan_successor_allowed": (
-                                allowed.stop_plan_successor
-                            ),
-                            "is_stop_allowed": allowed.stop,
-                            "is_cancel_allowed": allowed.cancel,
-                            "is_un_cancel_allowed": allowed.uncancel,
-                        }
+
+    def _get_allowed(self):
+        """Return the actions allowed on the lines, as a list of ``Allowed``
+        (or False when nothing is allowed) in the order of the recordset.
+
+        The criteria of every line are packed in a mask indexing the
+        precomputed ``ALLOWED_TABLE``, in one pass over the prefetched
+        values of the recordset.
+        """
+        today = fields.Date.today()
+        result = []
+        for rec in self:
+            if not rec.date_start:
+                result.append(False)
+                continue
+            result.append(
+                ALLOWED_TABLE[
+                    criteria_mask(
+                        compute_when(rec.date_start, rec.date_end, today),
+                        rec.date_end,
+                        rec.last_date_invoiced,
+                        rec.is_auto_renew,
+                        rec.successor_contract_line_id,
+                        rec.predecessor_contract_line_id.successor_contract_line_id,
+                        rec.is_canceled,
                     )
+                ]
+            )
+        return result
 
     @api.constrains("is_auto_renew", "successor_contract_line_id", "date_end")
     def _check_allowed(self):
@@ -155,28 +189,44 @@ class ContractLine(models.Model):
                         _("A contract line with a successor " "must have a end date")
                     )
 
+    def _has_overlapping_link(self, link_fname):
+        """Tell whether one of the lines overlaps the line it is linked to by
+        ``link_fname`` (its successor or its predecessor), checked for the
+        whole recordset in one query.
+        """
+        if not self:
+            return False
+        self.flush_model(["date_start", "date_end", link_fname])
+        if link_fname == "successor_contract_line_id":
+            overlap = SQL("line.date_end >= linked.date_start")
+        else:
+            overlap = SQL("line.date_start <= linked.date_end")
+        return bool(
+            self.env.execute_query(
+                SQL(
+                    "SELECT 1 FROM %(table)s line "
+                    "JOIN %(table)s linked ON linked.id = line.%(link)s "
+                    "WHERE line.id = ANY(%(ids)s) AND %(overlap)s LIMIT 1",
+                    table=SQL.identifier(self._table),
+                    link=SQL.identifier(link_fname),
+                    ids=self.ids,
+                    overlap=overlap,
+                )
+            )
+        )
+
     @api.constrains("successor_contract_line_id", "date_end")
     def _check_overlap_successor(self):
-        for rec in self:
-            if rec.date_end and rec.successor_contract_line_id:
-                if rec.date_end >= rec.successor_contract_line_id.date_start:
-                    raise ValidationError(
-                        _("Contract line and its successor overlapped")
-                    )
+        if self._has_overlapping_link("successor_contract_line_id"):
+            raise ValidationError(_("Contract line and its successor overlapped"))
 
     @api.constrains("predecessor_contract_line_id", "date_start")
     def _check_overlap_predecessor(self):
-        for rec in self:
-            if (
-                rec.predecessor_contract_line_id
-                and rec.predecessor_contract_line_id.date_end
-            ):
-                if rec.date_start <= rec.predecessor_contract_line_id.date_end:
-                    raise ValidationError(
-                        _("Contract line and its predecessor overlapped")
-                    )
+        if self._has_overlapping_link("predecessor_contract_line_id"):
+            raise ValidationError(_("Contract line and its predecessor overlapped"))
 
     @api.depends(
+        "display_type",
         "is_canceled",
         "date_start",
         "date_end",
@@ -227,110 +277,39 @@ class ContractLine(models.Model):
                     rec.state = "closed"
 
     @api.model
-    def _get_state_domain(self, state):
-        today = fields.Date.context_today(self)
-        if state == "upcoming":
-            return [
-                "&",
-                ("date_start", ">", today),
-                ("is_canceled", "=", False),
-            ]
-        if state == "in-progress":
-            return [
-                "&",
-                "&",
-                "&",
-                ("date_start", "<=", today),
-                ("is_canceled", "=", False),
-                "|",
-                ("date_end", ">=", today),
-                ("date_end", "=", False),
-                "|",
-                ("is_auto_renew", "=", True),
-                "&",
-                ("is_auto_renew", "=", False),
-                ("termination_notice_date", ">", today),
-            ]
-        if state == "to-renew":
-            return [
-                "&",
-                "&",
-                ("is_canceled", "=", False),
-                ("date_end", "<", today),
-                "|",
-                "&",
-                ("manual_renew_needed", "=", True),
-                ("successor_contract_line_id", "=", False),
-                ("is_auto_renew", "=", True),
-            ]
-        if state == "upcoming-close":
-            return [
-                "&",
-                "&",
-                "&",
-                "&",
-                "&",
-                ("date_start", "<=", today),
-                ("is_auto_renew", "=", False),
-                ("manual_renew_needed", "=", False),
-                ("is_canceled", "=", False),
-                ("termination_notice_date", "<", today),
-                ("date_end", ">=", today),
-            ]
-        if state == "closed":
-            return [
-                "&",
-                "&",
-                "&",
-                ("is_canceled", "=", False),
-                ("date_end", "<", today),
-                ("is_auto_renew", "=", False),
-                "|",
-                "&",
-                ("manual_renew_needed", "=", True),
-                ("successor_contract_line_id", "!=", False),
-                ("manual_renew_needed", "=", False),
+    def _get_state_outdated_domain(self, date):
+        """Return the domain of the lines whose state changes when today
+        becomes ``date``: the upcoming lines that start, the running lines
+        that end and those which pass their termination notice date.
+        """
+        return expression.OR(
+            [
+                [("state", "=", "upcoming"), ("date_start", "<=", date)],
+                [
+                    ("state", "in", ["in-progress", "upcoming-close"]),
+                    ("date_end", "<", date),
+                ],
+                [
+                    ("state", "=", "in-progress"),
+                    ("termination_notice_date", "<", date),
+                    ("is_auto_renew", "=", False),
+                    ("manual_renew_needed", "=", False),
+                ],
             ]
-        if state == "canceled":
-            return [("is_canceled", "=", True)]
-        if not state:
-            return [("display_type", "!=", False)]
+        )
 
     @api.model
-    def _search_state(self, operator, value):
-        states = [
-            "upcoming",
-            "in-progress",
-            "to-renew",
-            "upcoming-close",
-            "closed",
-            "canceled",
-            False,
-        ]
-        if operator == "=":
-            return self._get_state_domain(value)
-        if operator == "!=":
-            domain = []
-            for state in states:
-                if state != value:
-                    if domain:
-                        domain.insert(0, "|")
-                    domain.extend(self._get_state_domain(state))
-            return domain
-        if operator == "in":
-            domain = []
-            for state in value:
-                if domain:
-                    domain.insert(0, "|")
-                domain.extend(self._get_state_domain(state))
-            return domain
-
-        if operator == "not in":
-            if set(value) == set(states):
-                return [("id", "=", False)]
-            return self._search_state(
-                "in", [state for state in states if state not in value]
-            )
+    def cron_update_state(self, batch_size=1000):
+        """Recompute the stored state of the lines which depends on the
+        current date.
+        """
+        state_field = self._fields["state"]
+        domain = self._get_state_outdated_domain(fields.Date.context_today(self))
+        for line_ids in split_every(batch_size, self.search(domain).ids):
+            lines = self.browse(line_ids)
+            self.env.add_to_compute(state_field, lines)
+            lines.flush_recordset(["state"])
+            self.env.invalidate_all()
 
     @api.model
     def _get_first_date_end(
@@ -415,45 +394,76 @@ class ContractLine(models.Model):
             ),
         }
 
+    def _post_lines_message(self, title, line_bodies):
+        """Post on every contract of the lines one message made of ``title``
+        followed by the body of each of its lines.
+
+        :param line_bodies: {line: Markup} of the lines to list
+        """
+        lines_by_contract = defaultdict(list)
+        for rec in self:
+            lines_by_contract[rec.contract_id].append(rec)
+        for contract, lines in lines_by_contract.items():
+            contract.message_post(
+                body=Markup("<br/>").join(
+                    [Markup(title)] + [line_bodies[line] for line in lines]
+                )
+            )
+
+    def _get_period_message(self, date_start, date_end):
+        self.ensure_one()
+        return Markup(
+            _(
+                "- <strong>%(product)s</strong>: "
+                "%(new_date_start)s to %(new_date_end)s"
+            )
+        ) % {
+            "product": self.name,
+            "new_date_start": date_start,
+            "new_date_end": date_end,
+        }
+
     def stop(self, date_end, manual_renew_needed=False, post_message=True):
         """
         Put date_end on contract line
         We don't consider contract lines that end's before the new end date
+        The lines sharing the same new values are written together.
         :param date_end: new date end for contract line
         :return: True
         """
         if not all(self.mapped("is_stop_allowed")):
             raise ValidationError(_("Stop not allowed for this line"))
-        for rec in self:
-            if date_end < rec.date_start:
-                rec.cancel()
-            else:
-                if not rec.date_end or rec.date_end > date_end:
-                    old_date_end = rec.date_end
-                    rec.write(
-                        rec._prepare_value_for_stop(date_end, manual_renew_needed)
-                    )
-                    if post_message:
-                        msg = Markup(
-                            _(
-                                """Contract line for <strong>%(product)s</strong>
-                            stopped: <br/>
-                            - <strong>End</strong>: %(old_end)s -- %(new_end)s
-                            """
-                            )
-                        ) % {
-                            "product": rec.name,
-                            "old_end": old_date_end,
-                            "new_end": rec.date_end,
-                        }
-                        rec.contract_id.message_post(body=msg)
-                else:
-                    rec.write(
-                        {
-                            "is_auto_renew": False,
-                            "manual_renew_needed": manual_renew_needed,
-                        }
+        to_cancel = self.filtered(lambda line: date_end < line.date_start)
+        to_cancel.cancel()
+        lines = self - to_cancel
+        to_stop = lines.filtered(
+            lambda line: not line.date_end or line.date_end > date_end
+        )
+        old_date_ends = {rec: rec.date_end for rec in to_stop}
+        line_ids_by_values = defaultdict(list)
+        for rec in to_stop:
+            values = rec._prepare_value_for_stop(date_end, manual_renew_needed)
+            line_ids_by_values[tuple(sorted(values.items()))].append(rec.id)
+        for values, line_ids in line_ids_by_values.items():
+            self.browse(line_ids).write(dict(values))
+        (lines - to_stop).write(
+            {"is_auto_renew": False, "manual_renew_needed": manual_renew_needed}
+        )
+        if post_message:
+            to_stop._post_lines_message(
+                _("Contract lines stopped:"),
+                {
+                    rec: Markup(
+                        _("- <strong>%(product)s</strong>: %(old_end)s -- %(new_end)s")
                     )
+                    % {
+                        "product": rec.name,
+                        "old_end": old_date_ends[rec],
+                        "new_end": rec.date_end,
+                    }
+                    for rec in to_stop
+                },
+            )
         return True
 
     def _prepare_value_for_plan_successor(
@@ -497,35 +507,29 @@ class ContractLine(models.Model):
         successor_contract_line
         :return: successor_contract_line
         """
-        contract_line = self.env["contract.line"]
-        for rec in self:
-            if not rec.is_plan_successor_allowed:
-                raise ValidationError(_("Plan successor not allowed for this line"))
-            rec.is_auto_renew = False
-            new_line = self.create(
+        if not all(self.mapped("is_plan_successor_allowed")):
+            raise ValidationError(_("Plan successor not allowed for this line"))
+        self.write({"is_auto_renew": False})
+        self.fetch([name for name, field in self._fields.items() if field.store])
+        new_lines = self.create(
+            [
                 rec._prepare_value_for_plan_successor(
                     date_start, date_end, is_auto_renew, recurring_next_date
                 )
-            )
+                for rec in self
+            ]
+        )
+        for rec, new_line in zip(self, new_lines, strict=True):
             rec.successor_contract_line_id = new_line
-            contract_line |= new_line
-            if post_message:
-                msg = Markup(
-                    _(
-                        """Contract line for <strong>%(product)s</strong>
-                    planned a successor: <br/>
-                    - <strong>Start</strong>: %(new_date_start)s
-                    <br/>
-                    - <strong>End</strong>: %(new_date_end)s
-                    """
-                    )
-                ) % {
-                    "product": rec.name,
-                    "new_date_start": new_line.date_start,
-                    "new_date_end": new_line.date_end,
-                }
-                rec.contract_id.message_post(body=msg)
-        return contract_line
+        if post_message:
+            self._post_lines_message(
+                _("Contract lines planned a successor:"),
+                {
+                    rec: rec._get_period_message(new_line.date_start, new_line.date_end)
+                    for rec, new_line in zip(self, new_lines, strict=True)
+                },
+            )
+        return new_lines
 
     def stop_plan_successor(self, date_start, date_end, is_auto_renew):
         """
@@ -562,6 +566,8 @@ class ContractLine(models.Model):
         if not all(self.mapped("is_stop_plan_successor_allowed")):
             raise ValidationError(_("Stop/Plan successor not allowed for this line"))
         contract_line = self.env["contract.line"]
+        to_stop_ids = []
+        line_ids_by_new_date_end = defaultdict(list)
         for rec in self:
             if rec.date_start >= date_start:
                 if rec.date_start < date_end:
@@ -570,66 +576,44 @@ class ContractLine(models.Model):
                     delay = (date_end - date_start) + timedelta(days=1)
                 rec._delay(delay)
                 contract_line |= rec
-            else:
-                if rec.date_end and rec.date_end < date_start:
-                    rec.stop(date_start, post_message=False)
-                elif (
-                    rec.date_end
-                    and rec.date_end > date_start
-                    and rec.date_end < date_end
-                ):
-                    new_date_start = date_end + relativedelta(days=1)
-                    new_date_end = (
-                        date_end + (rec.date_end - date_start) + relativedelta(days=1)
-                    )
-                    rec.stop(
-                        date_start - relativedelta(days=1),
-                        manual_renew_needed=True,
-                        post_message=False,
-                    )
-                    contract_line |= rec.plan_successor(
-                        new_date_start,
-                        new_date_end,
-                        is_auto_renew,
-                        post_message=False,
-                    )
-                else:
-                    new_date_start = date_end + relativedelta(days=1)
-                    if rec.date_end:
-                        new_date_end = (
-                            rec.date_end
-                            + (date_end - date_start)
-                            + relativedelta(days=1)
-                        )
-                    else:
-                        new_date_end = rec.date_end
-
-                    rec.stop(
-                        date_start - relativedelta(days=1),
-                        manual_renew_needed=True,
-                        post_message=False,
-                    )
-                    contract_line |= rec.plan_successor(
-                        new_date_start,
-                        new_date_end,
-                        is_auto_renew,
-                        post_message=False,
-                    )
-            msg = Markup(
-                _(
-                    """Contract line for <strong>%(product)s</strong>
-                suspended: <br/>
-                - <strong>Suspension Start</strong>: %(new_date_start)s
-                <br/>
-                - <strong>Suspension End</strong>: %(new_date_end)s
-                """
+            elif rec.date_end and rec.date_end < date_start:
+                to_stop_ids.append(rec.id)
+            elif rec.date_end and rec.date_end > date_start and rec.date_end < date_end:
+                new_date_end = (
+                    date_end + (rec.date_end - date_start) + relativedelta(days=1)
                 )
-            ) % {
-                "product": rec.name,
-                "new_date_start": date_start,
-                "new_date_end": date_end,
-            }
-            rec.contract_id.message_post(body=msg)
+                line_ids_by_new_date_end[new_date_end].append(rec.id)
+            elif rec.date_end:
+                new_date_end = (
+                    rec.date_end + (date_end - date_start) + relativedelta(days=1)
+                )
+                line_ids_by_new_date_end[new_date_end].append(rec.id)
+            else:
+                line_ids_by_new_date_end[False].append(rec.id)
+        self.browse(to_stop_ids).stop(date_start, post_message=False)
+        self.browse(
+            [
+                line_id
+                for line_ids in line_ids_by_new_date_end.values()
+                for line_id in line_ids
+            ]
+        ).stop(
+            date_start - relativedelta(days=1),
+            manual_renew_needed=True,
+            post_message=False,
+        )
+        new_date_start = date_end + relativedelta(days=1)
+        for new_date_end, line_ids in line_ids_by_new_date_end.items():
+            contract_line |= self.browse(line_ids).plan_successor(
+                new_date_start,
+                new_date_end,
+                is_auto_renew,
+                post_message=False,
+            )
+        self._post_lines_message(
+            _("Contract lines suspended:"),
+            {rec: rec._get_period_message(date_start, date_end) for rec in self},
+        )
         return contract_line
 
     def cancel(self):
@@ -670,8 +654,7 @@ class ContractLine(models.Model):
                 predecessor_contract_line = rec.predecessor_contract_line_id
                 assert not predecessor_contract_line.successor_contract_line_id
                 predecessor_contract_line.successor_contract_line_id = rec
-            rec.is_canceled = False
-            rec.recurring_next_date = recurring_next_date
+        self.write({"is_canceled": False, "recurring_next_date": recurring_next_date})
         return True
 
     def action_uncancel(self):
@@ -762,32 +745,59 @@ class ContractLine(models.Model):
         )
         return date_end
 
-    def _renew_create_line(self, date_end):
-        self.ensure_one()
-        date_start = self.date_end + relativedelta(days=1)
-        is_auto_renew = self.is_auto_renew
-        self.stop(self.date_end, post_message=False)
-        new_line = self.plan_successor(
-            date_start, date_end, is_auto_renew, post_message=False
-        )
-        return new_line
+    def _renew_create_lines(self, renewal_dates):
+        """Stop the lines and plan their successors, calling ``stop()`` and
+        ``plan_successor()`` once per group of lines renewed alike.
 
-    def _renew_extend_line(self, date_end):
-        self.ensure_one()
-        self.date_end = date_end
+        :param renewal_dates: {line: (date_start, date_end)} of the renewals
+        :return: {line: successor line}
+        """
+        line_ids_by_renewal = defaultdict(list)
+        for rec in self:
+            key = (rec.date_end, *renewal_dates[rec], rec.is_auto_renew)
+            line_ids_by_renewal[key].append(rec.id)
+        successors = {}
+        for renewal, line_ids in line_ids_by_renewal.items():
+            stop_date, date_start, date_end, is_auto_renew = renewal
+            lines = self.browse(line_ids)
+            lines.stop(stop_date, post_message=False)
+            new_lines = lines.plan_successor(
+                date_start, date_end, is_auto_renew, post_message=False
+            )
+            successors.update(zip(lines, new_lines, strict=True))
+        return successors
+
+    def _renew_extend_lines(self, renewal_dates):
+        """Move the end date of the lines, with one write per new end date.
+
+        :param renewal_dates: {line: (date_start, date_end)} of the renewals
+        """
+        line_ids_by_date_end = defaultdict(list)
+        for rec in self:
+            line_ids_by_date_end[renewal_dates[rec][1]].append(rec.id)
+        for date_end, line_ids in line_ids_by_date_end.items():
+            self.browse(line_ids).write({"date_end": date_end})
         return self
 
     def renew(self):
-        res = self.env["contract.line"]
+        """Renew the lines for their next auto-renew period, extending them
+        or creating their successors according to the company setting.
+
+        :return: the renewed lines (successors or extended lines)
+        """
+        renewal_dates = {
+            rec: (rec.date_end + relativedelta(days=1), rec._get_renewal_new_date_end())
+            for rec in self
+        }
+        to_create = self.filtered(
+            lambda line: (
+                line.contract_id.company_id.create_new_line_at_contract_line_renew
+            )
+        )
+        successors = to_create._renew_create_lines(renewal_dates)
+        (self - to_create)._renew_extend_lines(renewal_dates)
         for rec in self:
-            company = rec.contract_id.company_id
-            date_end = rec._get_renewal_new_date_end()
-            date_start = rec.date_end + relativedelta(days=1)
-            if company.create_new_line_at_contract_line_renew:
-                new_line = rec._renew_create_line(date_end)
-            else:
-                new_line = rec._renew_extend_line(date_end)
-            res |= new_line
+            date_start, date_end = renewal_dates[rec]
             msg = Markup(
                 _(
                     """Contract line for <strong>%(product)s</strong>
@@ -803,7 +813,9 @@ class ContractLine(models.Model):
                 "new_date_end": date_end,
             }
             rec.contract_id.message_post(body=msg)
-        return res
+        return self.browse(
+            [successors[rec].id if rec in successors else rec.id for rec in self]
+        )
 
     @api.model
     def _contract_line_to_renew_domain(self):
@@ -813,11 +825,154 @@ class ContractLine(models.Model):
             ("termination_notice_date", "<=", fields.Date.context_today(self)),
         ]
 
+    @api.model
+    def _get_renew_cron_batch_size(self):
+        """Number of contracts whose lines are renewed (and committed)
+        together by the cron, 0 to renew everything in one transaction.
+        """
+        return int(
+            self.env["ir.config_parameter"]
+            .sudo()
+            .get_param("contract.renew_cron.batch_size", 0)
+        )
+
+    @api.model
+    def _get_renew_cron_cursor(self, date):
+        """Return the last contract processed by an interrupted run of the
+        same day, or 0.
+        """
+        value = (
+            self.env["ir.config_parameter"]
+            .sudo()
+            .get_param("contract.renew_cron.cursor")
+        )
+        if not value:
+            return 0
+        cursor = json.loads(value)
+        if cursor.get("date") != str(date):
+            return 0
+        return cursor["contract_id"]
+
+    @api.model
+    def _set_renew_cron_cursor(self, date, contract_id):
+        value = False
+        if contract_id:
+            value = json.dumps({"date": str(date), "contract_id": contract_id})
+        self.env["ir.config_parameter"].sudo().set_param(
+            "contract.renew_cron.cursor", value
+        )
+
     @api.model
     def cron_renew_contract_line(self):
         domain = self._contract_line_to_renew_domain()
-        to_renew = self.search(domain)
-        to_renew.renew()
+        batch_size = self._get_renew_cron_batch_size()
+        if not batch_size:
+            return self.search(domain).renew()
+        today = fields.Date.context_today(self)
+        last_contract_id = self._get_renew_cron_cursor(today)
+        groups = self._read_group(
+            expression.AND([domain, [("contract_id", ">", last_contract_id)]]),
+            ["contract_id"],
+            ["id:array_agg"],
+        )
+        groups.sort(key=lambda group: group[0].id)
+        contract_model = self.env["contract.contract"]
+        renewed = self.browse()
+        for chunk in split_every(batch_size, groups):
+            lines = self.browse(
+                [line_id for __, line_ids in chunk for line_id in line_ids]
+            )
+            start = time.perf_counter()
+            renewed |= lines.renew()
+            self._set_renew_cron_cursor(today, chunk[-1][0].id)
+            contract_model._cron_commit()
+            _logger.info(
+                "Contract line renewal cron: %d contracts, %d lines in %.2fs",
+                len(chunk),
+                len(lines),
+                time.perf_counter() - start,
+            )
+        self._set_renew_cron_cursor(today, False)
+        contract_model._cron_commit()
+        return renewed
+
+    @api.model
+    def _get_renewal_simulation_domain(self):
+        return [
+            ("is_auto_renew", "=", True),
+            ("is_canceled", "=", False),
+            ("date_end", "!=", False),
+        ]
+
+    @api.model
+    def simulate_renewals(self, date_from=None, months=24, domain=None, as_json=False):
+        """Project the chain of the future renewals of the auto-renewed
+        lines over the next ``months``, without renewing anything.
+
+        A line is renewed on its termination notice date, or on
+        ``date_from`` when it is already due. The renewal amount is the
+        subtotal of the line for every invoicing period of the renewed term.
+
+        :param date_from: optional start of the horizon instead of today
+        :param domain: optional domain restricting the simulated lines
+        :param as_json: return the result serialized as JSON
+        :return: dictionary with the renewal ``count`` and ``amount`` (in the
+            currency of the lines) of every ``days`` of the horizon
+        """
+        date_from = fields.Date.to_date(date_from) or fields.Date.context_today(self)
+        date_to = date_from + relativedelta(months=months)
+        lines = self.search_fetch(
+            expression.AND([self._get_renewal_simulation_domain(), domain or []]),
+            [
+                "date_end",
+                "auto_renew_rule_type",
+                "auto_renew_interval",
+                "termination_notice_rule_type",
+                "termination_notice_interval",
+                "recurring_rule_type",
+                "recurring_interval",
+            ],
+        )
+        days = defaultdict(lambda: {"count": 0, "amount": 0.0})
+        for line in lines:
+            notice_delta = contract_recurrence.get_relative_delta(
+                line.termination_notice_rule_type, line.termination_notice_interval
+            )
+            renew_delta = contract_recurrence.get_relative_delta(
+                line.auto_renew_rule_type, line.auto_renew_interval
+            )
+            date_end = line.date_end
+            while True:
+                renewal_date = max(date_end - notice_delta, date_from)
+                if renewal_date > date_to:
+                    break
+                date_start = date_end + relativedelta(days=1)
+                date_end = date_start + renew_delta - relativedelta(days=1)
+                if date_end < date_start:
+                    break
+                period_count = 0
+                period_start = date_start
+                while period_start <= date_end:
+                    period_count += 1
+                    period_start = contract_recurrence.add_period(
+                        period_start,
+                        line.recurring_rule_type,
+                        line.recurring_interval or 1,
+                    )
+                day = days[renewal_date]
+                day["count"] += 1
+                day["amount"] += line.price_subtotal * period_count
+        result = {
+            "date_from": date_from,
+            "date_to": date_to,
+            "line_count": len(lines),
+            "renewal_count": sum(day["count"] for day in days.values()),
+            "amount": sum(day["amount"] for day in days.values()),
+            "days": [dict(days[date], date=date) for date in sorted(days)],
+        }
+        if as_json:
+            return json.dumps(result, default=str)
+        return result
 
     def unlink(self):
         """stop unlink uncnacled lines"""
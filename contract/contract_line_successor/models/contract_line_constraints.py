@@ -374,9 +374,63 @@ criteria_allowed_dict = {}
 for c in CRITERIA_ALLOWED_DICT:
     _add(criteria_allowed_dict, c, CRITERIA_ALLOWED_DICT[c])
 
+NOT_ALLOWED = Allowed(
+    plan_successor=False,
+    stop_plan_successor=False,
+    stop=False,
+    cancel=False,
+    uncancel=False,
+)
+
+# Criteria packed in an integer: ``when`` on the 2 lowest bits, then one bit
+# per boolean criterion, in the order of the Criteria fields.
+WHEN_MASK = {"BEFORE": 0, "IN": 1, "AFTER": 2}
+HAS_DATE_END = 1 << 2
+HAS_LAST_DATE_INVOICED = 1 << 3
+IS_AUTO_RENEW = 1 << 4
+HAS_SUCCESSOR = 1 << 5
+PREDECESSOR_HAS_SUCCESSOR = 1 << 6
+CANCELED = 1 << 7
+
+
+def criteria_mask(
+    when,
+    has_date_end,
+    has_last_date_invoiced,
+    is_auto_renew,
+    has_successor,
+    predecessor_has_successor,
+    canceled,
+):
+    mask = WHEN_MASK[when]
+    if has_date_end:
+        mask |= HAS_DATE_END
+    if has_last_date_invoiced:
+        mask |= HAS_LAST_DATE_INVOICED
+    if is_auto_renew:
+        mask |= IS_AUTO_RENEW
+    if has_successor:
+        mask |= HAS_SUCCESSOR
+    if predecessor_has_successor:
+        mask |= PREDECESSOR_HAS_SUCCESSOR
+    if canceled:
+        mask |= CANCELED
+    return mask
 
-def compute_when(date_start, date_end):
-    today = Date.today()
+
+def _build_allowed_table():
+    table = [False] * (CANCELED << 1)
+    for criteria, allowed in criteria_allowed_dict.items():
+        table[criteria_mask(*criteria)] = allowed
+    return tuple(table)
+
+
+# Allowed actions indexed by criteria mask, False for impossible criteria
+ALLOWED_TABLE = _build_allowed_table()
+
+
+def compute_when(date_start, date_end, today=None):
+    today = today or Date.today()
     if today < date_start:
         return "BEFORE"
     if date_end and today > date_end:
@@ -415,15 +469,16 @@ def get_allowed(
     predecessor_contract_line_id,
     is_canceled,
 ):
-    criteria = compute_criteria(
-        date_start,
-        date_end,
-        has_last_date_invoiced,
-        is_auto_renew,
-        successor_contract_line_id,
-        predecessor_contract_line_id,
-        is_canceled,
-    )
-    if criteria in criteria_allowed_dict:
-        return criteria_allowed_dict[criteria]
-    return False
+    return ALLOWED_TABLE[
+        criteria_mask(
+            *compute_criteria(
+                date_start,
+                date_end,
+                has_last_date_invoiced,
+                is_auto_renew,
+                successor_contract_line_id,
+                predecessor_contract_line_id,
+                is_canceled,
+            )
+        )
+    ]
@@ -0,0 +1,237 @@
+# Copyright 2026 ACSONE SA/NV
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
+
+import logging
+
+from odoo import _, api, fields, models
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools import split_every
+
+_logger = logging.getLogger(__name__)
+
+# Flag of the contract lines allowing every operation
+ALLOWED_FLAGS = {
+    "stop": "is_stop_allowed",
+    "plan_successor": "is_plan_successor_allowed",
+    "stop_plan_successor": "is_stop_plan_successor_allowed",
+    "cancel": "is_cancel_allowed",
+    "uncancel": "is_un_cancel_allowed",
+}
+
+
+class ContractLineMassOperation(models.Model):
+    _name = "contract.line.mass.operation"
+    _description = "Contract Line Mass Operation"
+    _order = "id desc"
+
+    name = fields.Char(compute="_compute_name")
+    operation = fields.Selection(
+        selection=[
+            ("stop", "Stop"),
+            ("plan_successor", "Plan successor"),
+            ("stop_plan_successor", "Suspend"),
+            ("cancel", "Cancel"),
+            ("uncancel", "Un-cancel"),
+        ],
+        required=True,
+        default="stop",
+    )
+    date_start = fields.Date()
+    date_end = fields.Date()
+    recurring_next_date = fields.Date(string="Next Invoice Date")
+    is_auto_renew = fields.Boolean(default=False)
+    manual_renew_needed = fields.Boolean(
+        default=False,
+        help="This flag is used to make a difference between a definitive stop"
+        "and temporary one for which a user is not able to plan a"
+        "successor in advance",
+    )
+    contract_line_ids = fields.Many2many(
+        comodel_name="contract.line",
+        string="Contract Lines",
+        default=lambda self: self._default_contract_line_ids(),
+    )
+    line_count = fields.Integer(string="Lines", compute="_compute_line_count")
+    done_count = fields.Integer(string="Processed Lines", readonly=True)
+    progress = fields.Float(compute="_compute_progress")
+    state = fields.Selection(
+        selection=[
+            ("draft", "Draft"),
+            ("queued", "Queued"),
+            ("done", "Done"),
+            ("failed", "Failed"),
+        ],
+        default="draft",
+        required=True,
+        readonly=True,
+    )
+    error = fields.Text(readonly=True)
+
+    @api.model
+    def _default_contract_line_ids(self):
+        if self.env.context.get("active_model") != "contract.line":
+            return False
+        return self.env["contract.line"].browse(self.env.context.get("active_ids"))
+
+    @api.depends("operation", "create_date")
+    def _compute_name(self):
+        operations = dict(self._fields["operation"]._description_selection(self.env))
+        for operation in self:
+            operation.name = (
+                f"{operations.get(operation.operation, '')} "
+                f"{operation.create_date or ''}"
+            ).strip()
+
+    @api.depends("contract_line_ids")
+    def _compute_line_count(self):
+        for operation in self:
+            operation.line_count = len(operation.contract_line_ids)
+
+    @api.depends("done_count", "line_count")
+    def _compute_progress(self):
+        for operation in self:
+            operation.progress = (
+                100.0 * operation.done_count / operation.line_count
+                if operation.line_count
+                else 0.0
+            )
+
+    @api.model
+    def _get_sync_limit(self):
+        """Number of lines above which the operation is run in the
+        background by a scheduled action.
+        """
+        return int(
+            self.env["ir.config_parameter"]
+            .sudo()
+            .get_param("contract.line.mass_operation.sync_limit", 1000)
+        )
+
+    @api.model
+    def _get_batch_size(self):
+        """Number of contracts whose lines are processed (and committed)
+        together in the background.
+        """
+        return int(
+            self.env["ir.config_parameter"]
+            .sudo()
+            .get_param("contract.line.mass_operation.batch_size", 100)
+        )
+
+    def _check_allowed_lines(self, lines):
+        self.ensure_one()
+        flag = ALLOWED_FLAGS[self.operation]
+        not_allowed = lines.filtered(
+            lambda line: not line.display_type and not line[flag]
+        )
+        if not_allowed:
+            raise ValidationError(
+                _(
+                    "%(operation)s not allowed for these lines:\n%(lines)s",
+                    operation=dict(
+                        self._fields["operation"]._description_selection(self.env)
+                    )[self.operation],
+                    lines="\n".join(not_allowed[:20].mapped("display_name")),
+                )
+            )
+
+    def _apply(self, lines):
+        """Apply the operation on ``lines``, in bulk."""
+        self.ensure_one()
+        lines = lines.filtered(lambda line: not line.display_type)
+        self._check_allowed_lines(lines)
+        if self.operation == "stop":
+            lines.stop(self.date_end, manual_renew_needed=self.manual_renew_needed)
+        elif self.operation == "plan_successor":
+            lines.plan_successor(self.date_start, self.date_end, self.is_auto_renew)
+        elif self.operation == "stop_plan_successor":
+            lines.stop_plan_successor(
+                self.date_start, self.date_end, self.is_auto_renew
+            )
+        elif self.operation == "cancel":
+            lines.cancel()
+        elif self.operation == "uncancel":
+            lines.uncancel(self.recurring_next_date)
+        return lines
+
+    def _get_line_chunks(self, batch_size):
+        """Split the lines not processed yet in chunks of ``batch_size``
+        contracts, so that every contract gets one message per operation.
+        """
+        self.ensure_one()
+        groups = self.env["contract.line"]._read_group(
+            [("id", "in", self.contract_line_ids.ids)],
+            ["contract_id"],
+            ["id:array_agg"],
+        )
+        groups.sort(key=lambda group: group[0].id)
+        done = 0
+        pending = []
+        for __, line_ids in groups:
+            if done < self.done_count:
+                done += len(line_ids)
+                continue
+            pending.append(sorted(line_ids))
+        for chunk in split_every(batch_size, pending):
+            yield self.env["contract.line"].browse(
+                [line_id for line_ids in chunk for line_id in line_ids]
+            )
+
+    def action_apply(self):
+        """Apply the operation right away on small selections, queue it for
+        the scheduled action otherwise.
+        """
+        self.ensure_one()
+        self._check_allowed_lines(self.contract_line_ids)
+        if self.line_count <= self._get_sync_limit():
+            self._apply(self.contract_line_ids)
+            self.write({"state": "done", "done_count": self.line_count})
+            return True
+        self.state = "queued"
+        self.env.ref(
+            "contract_line_successor.contract_line_mass_operation_cron"
+        )._trigger()
+        return {
+            "type": "ir.actions.act_window",
+            "res_model": self._name,
+            "res_id": self.id,
+            "view_mode": "form",
+            "target": "current",
+        }
+
+    def _process(self):
+        """Apply the operation by chunks of contracts, committing and
+        reporting the progress after each chunk. The processed lines are
+        counted, so an interrupted operation resumes where it stopped. A
+        failing chunk is rolled back to its savepoint, the previous ones stay
+        committed.
+        """
+        self.ensure_one()
+        contract_model = self.env["contract.contract"]
+        for lines in self._get_line_chunks(self._get_batch_size()):
+            with self.env.cr.savepoint():
+                self._apply(lines)
+            self.done_count += len(lines)
+            contract_model._cron_commit()
+            self.env["ir.cron"]._notify_progress(
+                done=self.done_count, remaining=self.line_count - self.done_count
+            )
+        self.write({"state": "done", "done_count": self.line_count})
+        contract_model._cron_commit()
+
+    @api.model
+    def cron_process(self):
+        contract_model = self.env["contract.contract"]
+        for operation in self.search([("state", "=", "queued")], order="id"):
+            try:
+                operation._process()
+            except UserError as error:
+                _logger.warning(
+                    "Contract line mass operation %s failed: %s", operation, error
+                )
+                operation.write({"state": "failed", "error": str(error)})
+                contract_model._cron_commit()
+            except Exception:
+                _logger.exception("Contract line mass operation %s failed", operation)
+                raise
+        return True
@@ -15,3 +15,15 @@ class ContractTemplate(models.Model):
             record.is_auto_renew = all(
                 line.is_auto_renew for line in record.contract_line_ids
             )
+
+    def _prepare_contract_line_values(self, date_start):
+        lines_values = super()._prepare_contract_line_values(date_start)
+        contract_line_model = self.env["contract.line"]
+        for values in lines_values:
+            if values.get("is_auto_renew"):
+                values["date_end"] = contract_line_model._get_first_date_end(
+                    date_start,
+                    values["auto_renew_rule_type"],
+                    values["auto_renew_interval"],
+                )
+        return lines_values
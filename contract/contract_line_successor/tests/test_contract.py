@@ -1,10 +1,14 @@
 # Copyright 2018 ACSONE SA/NV
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
 
+import json
 from datetime import timedelta
+from unittest import mock
 
 from dateutil.relativedelta import relativedelta
+from freezegun import freeze_time
 
+from odoo import Command, fields
 from odoo.exceptions import ValidationError
 
 from odoo.addons.contract.tests.test_contract import (
@@ -12,6 +16,13 @@ from odoo.addons.contract.tests.test_contract import (
     to_date,
 )
 
+from ..models.contract_line_constraints import (
+    ALLOWED_TABLE,
+    criteria_allowed_dict,
+    criteria_mask,
+    get_allowed,
+)
+
 
 class TestContractSuccessor(TestContract):
     @classmethod
@@ -468,6 +479,166 @@ class TestContractSuccessor(TestContract):
         with self.assertRaises(ValidationError):
             self.acct_line.date_end = self.today + relativedelta(months=6)
 
+    def test_overlap_batch(self):
+        self.acct_line.write(
+            {
+                "date_start": self.today,
+                "recurring_next_date": self.today,
+                "date_end": self.today + relativedelta(months=3),
+                "is_auto_renew": False,
+            }
+        )
+        lines = self.acct_line | self.acct_line.copy()
+        successors = self.env["contract.line"]
+        for line in lines:
+            successors |= line.plan_successor(
+                self.today + relativedelta(months=5),
+                self.today + relativedelta(months=7),
+                False,
+                post_message=False,
+            )
+        lines.write({"date_end": self.today + relativedelta(months=4)})
+        with self.assertRaisesRegex(ValidationError, "its successor overlapped"):
+            lines.write({"date_end": self.today + relativedelta(months=5)})
+        with self.assertRaisesRegex(ValidationError, "its predecessor overlapped"):
+            successors.write({"date_start": self.today + relativedelta(months=4)})
+
+    def _prepare_mass_operation_lines(self):
+        self.acct_line.write(
+            {
+                "date_start": self.today,
+                "recurring_next_date": self.today,
+                "date_end": self.today + relativedelta(months=6),
+                "is_auto_renew": False,
+            }
+        )
+        contract_2 = self.contract.copy()
+        return (
+            self.contract.contract_line_ids | contract_2.contract_line_ids
+        ).filtered(lambda line: not line.display_type)
+
+    def test_mass_operation_stop(self):
+        lines = self._prepare_mass_operation_lines()
+        operation = (
+            self.env["contract.line.mass.operation"]
+            .with_context(active_model="contract.line", active_ids=lines.ids)
+            .create(
+                {"operation": "stop", "date_end": self.today + relativedelta(months=2)}
+            )
+        )
+        self.assertEqual(operation.contract_line_ids, lines)
+        operation.action_apply()
+        self.assertEqual(operation.state, "done")
+        self.assertEqual(operation.progress, 100.0)
+        self.assertEqual(
+            set(lines.mapped("date_end")), {self.today + relativedelta(months=2)}
+        )
+        for contract in lines.contract_id:
+            messages = contract.message_ids.filtered(
+                lambda message: "Contract lines stopped" in message.body
+            )
+            self.assertEqual(len(messages), 1)
+
+    def test_mass_operation_background(self):
+        self.env["ir.config_parameter"].sudo().set_param(
+            "contract.line.mass_operation.sync_limit", 0
+        )
+        self.env["ir.config_parameter"].sudo().set_param(
+            "contract.line.mass_operation.batch_size", 1
+        )
+        lines = self._prepare_mass_operation_lines()
+        operation = self.env["contract.line.mass.operation"].create(
+            {
+                "operation": "plan_successor",
+                "date_start": self.today + relativedelta(months=7),
+                "date_end": self.today + relativedelta(months=9),
+                "contract_line_ids": [Command.set(lines.ids)],
+            }
+        )
+        operation.action_apply()
+        self.assertEqual(operation.state, "queued")
+        self.assertFalse(lines.successor_contract_line_id)
+        self.env["contract.line.mass.operation"].cron_process()
+        self.assertEqual(operation.state, "done")
+        self.assertEqual(operation.done_count, len(lines))
+        self.assertEqual(len(lines.successor_contract_line_id), len(lines))
+
+    def test_mass_operation_background_failure(self):
+        self.env["ir.config_parameter"].sudo().set_param(
+            "contract.line.mass_operation.sync_limit", 0
+        )
+        self.env["ir.config_parameter"].sudo().set_param(
+            "contract.line.mass_operation.batch_size", 1
+        )
+        lines = self._prepare_mass_operation_lines()
+        operation = self.env["contract.line.mass.operation"].create(
+            {
+                "operation": "plan_successor",
+                "date_start": self.today + relativedelta(months=7),
+                "date_end": self.today + relativedelta(months=9),
+                "contract_line_ids": [Command.set(lines.ids)],
+            }
+        )
+        operation.action_apply()
+        operation_cls = self.env.registry["contract.line.mass.operation"]
+        original_apply = operation_cls._apply
+
+        def _apply(records, chunk):
+            result = original_apply(records, chunk)
+            if chunk.contract_id != self.contract:
+                raise ValidationError("Chunk failure")
+            return result
+
+        with mock.patch.object(operation_cls, "_apply", _apply):
+            self.env["contract.line.mass.operation"].cron_process()
+        self.assertEqual(operation.state, "failed")
+        self.assertEqual(operation.error, "Chunk failure")
+        # The first chunk is kept, the failing one is rolled back
+        first_lines = lines.filtered(lambda line: line.contract_id == self.contract)
+        self.assertEqual(operation.done_count, len(first_lines))
+        self.assertEqual(lines.filtered("successor_contract_line_id"), first_lines)
+
+    def test_mass_operation_background_error(self):
+        self.env["ir.config_parameter"].sudo().set_param(
+            "contract.line.mass_operation.sync_limit", 0
+        )
+        lines = self._prepare_mass_operation_lines()
+        operation = self.env["contract.line.mass.operation"].create(
+            {
+                "operation": "cancel",
+                "contract_line_ids": [Command.set(lines.ids)],
+            }
+        )
+        operation.action_apply()
+        operation_cls = self.env.registry["contract.line.mass.operation"]
+        with (
+            mock.patch.object(
+                operation_cls, "_apply", side_effect=RuntimeError("Unexpected")
+            ),
+            self.assertLogs(
+                "odoo.addons.contract_line_successor.models."
+                "contract_line_mass_operation",
+                level="ERROR",
+            ),
+            self.assertRaisesRegex(RuntimeError, "Unexpected"),
+        ):
+            self.env["contract.line.mass.operation"].cron_process()
+        # Unexpected errors are not turned into a failed operation
+        self.assertEqual(operation.state, "queued")
+
+    def test_mass_operation_not_allowed(self):
+        lines = self._prepare_mass_operation_lines()
+        operation = self.env["contract.line.mass.operation"].create(
+            {
+                "operation": "uncancel",
+                "recurring_next_date": self.today,
+                "contract_line_ids": [Command.set(lines.ids)],
+            }
+        )
+        with self.assertRaisesRegex(ValidationError, "not allowed"):
+            operation.action_apply()
+        self.assertEqual(operation.state, "draft")
+
     def test_plan_successor_wizard(self):
         self.acct_line.write(
             {
@@ -605,6 +776,97 @@ class TestContractSuccessor(TestContract):
         self.assertTrue(line_3.successor_contract_line_id)
         self.assertFalse(line_4.successor_contract_line_id)
 
+    def test_cron_renew_contract_line_batched(self):
+        self.env["ir.config_parameter"].sudo().set_param(
+            "contract.renew_cron.batch_size", 1
+        )
+        self.acct_line.write({"date_end": self.today, "is_auto_renew": True})
+        line_1 = self.acct_line.copy({"date_end": self.today})
+        contract_2 = self.contract.copy()
+        lines_2 = contract_2.contract_line_ids.filtered(
+            lambda line: not line.display_type
+        )
+        lines_2.write({"date_end": self.today, "is_auto_renew": True})
+        renewed = self.env["contract.line"].cron_renew_contract_line()
+        lines = self.acct_line | line_1 | lines_2
+        self.assertEqual(renewed, lines.successor_contract_line_id)
+        self.assertEqual(len(renewed), len(lines))
+        self.assertTrue(all(renewed.mapped("is_auto_renew")))
+        for contract in self.contract | contract_2:
+            messages = contract.message_ids.filtered(
+                lambda message: "renewed:" in message.body
+            )
+            self.assertEqual(
+                len(messages),
+                len(lines.filtered(lambda line, c=contract: line.contract_id == c)),
+            )
+        self.assertFalse(
+            self.env["ir.config_parameter"]
+            .sudo()
+            .get_param("contract.renew_cron.cursor")
+        )
+
+    def test_cron_renew_contract_line_resume(self):
+        self.env["ir.config_parameter"].sudo().set_param(
+            "contract.renew_cron.batch_size", 1
+        )
+        self.acct_line.write({"date_end": self.today, "is_auto_renew": True})
+        self.env["contract.line"]._set_renew_cron_cursor(
+            fields.Date.context_today(self.acct_line), self.contract.id
+        )
+        self.env["contract.line"].cron_renew_contract_line()
+        # The contract was processed by the interrupted run
+        self.assertFalse(self.acct_line.successor_contract_line_id)
+        self.env["contract.line"].cron_renew_contract_line()
+        self.assertTrue(self.acct_line.successor_contract_line_id)
+
+    def test_simulate_renewals(self):
+        self.acct_line.write(
+            {
+                "date_end": self.today + relativedelta(days=10),
+                "is_auto_renew": True,
+                "auto_renew_rule_type": "yearly",
+                "auto_renew_interval": 1,
+                "termination_notice_rule_type": "monthly",
+                "termination_notice_interval": 1,
+                "recurring_rule_type": "monthly",
+                "recurring_interval": 1,
+            }
+        )
+        result = self.env["contract.line"].simulate_renewals(
+            date_from=self.today, domain=[("id", "=", self.acct_line.id)]
+        )
+        # Due today, then two yearly renewals within the 24 months
+        self.assertEqual(result["line_count"], 1)
+        self.assertEqual(result["renewal_count"], 3)
+        self.assertEqual(result["days"][0]["date"], self.today)
+        date_end = self.acct_line.date_end + relativedelta(days=1)
+        date_end += relativedelta(years=1, days=-1)
+        self.assertEqual(result["days"][1]["date"], date_end - relativedelta(months=1))
+        self.assertAlmostEqual(result["amount"], self.acct_line.price_subtotal * 12 * 3)
+        # Nothing is renewed
+        self.assertFalse(self.acct_line.successor_contract_line_id)
+        self.assertEqual(self.acct_line.date_end, self.today + relativedelta(days=10))
+        self.assertEqual(
+            json.loads(
+                self.env["contract.line"].simulate_renewals(
+                    date_from=self.today,
+                    domain=[("id", "=", self.acct_line.id)],
+                    as_json=True,
+                )
+            )["renewal_count"],
+            3,
+        )
+
+    def test_contract_line_to_renew_index(self):
+        self.assertIn(
+            "contract_line_to_renew_index",
+            self._explain(
+                "contract.line",
+                self.env["contract.line"]._contract_line_to_renew_domain(),
+            ),
+        )
+
     def test_renew_create_new_line(self):
         date_start = self.today - relativedelta(months=9)
         date_end = date_start + relativedelta(months=12) - relativedelta(days=1)
@@ -624,6 +886,40 @@ class TestContractSuccessor(TestContract):
         self.assertEqual(new_line.date_start, date_start + relativedelta(months=12))
         self.assertEqual(new_line.date_end, date_end + relativedelta(months=12))
 
+    def test_renew_stop_plan_successor(self):
+        self.acct_line.write({"date_end": self.today, "is_auto_renew": True})
+        line_1 = self.acct_line.copy({"date_end": self.today})
+        line_2 = self.acct_line.copy({"date_end": self.today + relativedelta(months=1)})
+        lines = self.acct_line | line_1 | line_2
+        line_cls = self.env.registry["contract.line"]
+        with (
+            mock.patch.object(
+                line_cls, "stop", autospec=True, side_effect=line_cls.stop
+            ) as stop,
+            mock.patch.object(
+                line_cls,
+                "plan_successor",
+                autospec=True,
+                side_effect=line_cls.plan_successor,
+            ) as plan_successor,
+        ):
+            renewed = lines.renew()
+        # The lines renewed alike are stopped and planned together
+        self.assertEqual(stop.call_count, 2)
+        self.assertEqual(plan_successor.call_count, 2)
+        self.assertEqual(
+            {call.args[0] for call in plan_successor.call_args_list},
+            {self.acct_line | line_1, line_2},
+        )
+        self.assertEqual(renewed, lines.successor_contract_line_id)
+        self.assertEqual(
+            [line.predecessor_contract_line_id for line in renewed], list(lines)
+        )
+        messages = self.contract.message_ids.filtered(
+            lambda message: "renewed:" in message.body
+        )
+        self.assertEqual(len(messages), 3)
+
     def test_renew_extend_original_line(self):
         self.contract.company_id.create_new_line_at_contract_line_renew = False
         date_start = self.today - relativedelta(months=9)
@@ -741,8 +1037,6 @@ class TestContractSuccessor(TestContract):
         self.assertEqual(set(lines.mapped("state")), set(states))
         lines = self.env["contract.line"].search([("state", "in", [])])
         self.assertFalse(lines.mapped("state"))
-        with self.assertRaises(TypeError):
-            self.env["contract.line"].search([("state", "in", "upcoming")])
         lines = self.env["contract.line"].search([("state", "not in", [])])
         self.assertEqual(set(lines.mapped("state")), set(states))
         lines = self.env["contract.line"].search([("state", "not in", states)])
@@ -751,6 +1045,59 @@ class TestContractSuccessor(TestContract):
         lines = self.env["contract.line"].search([("state", "not in", state2)])
         self.assertEqual(set(lines.mapped("state")), set(states) - set(state2))
 
+    def test_allowed_table(self):
+        for criteria, allowed in criteria_allowed_dict.items():
+            self.assertEqual(ALLOWED_TABLE[criteria_mask(*criteria)], allowed)
+        lines = self.acct_line | self.acct_line.copy(
+            {
+                "date_start": self.today + relativedelta(days=10),
+                "recurring_next_date": self.today + relativedelta(days=10),
+                "date_end": self.today + relativedelta(months=2),
+                "is_auto_renew": False,
+            }
+        )
+        lines[1].cancel()
+        self.assertEqual(
+            lines._get_allowed(),
+            [
+                get_allowed(
+                    line.date_start,
+                    line.date_end,
+                    line.last_date_invoiced,
+                    line.is_auto_renew,
+                    line.successor_contract_line_id,
+                    line.predecessor_contract_line_id,
+                    line.is_canceled,
+                )
+                for line in lines
+            ],
+        )
+        self.assertTrue(lines[1].is_un_cancel_allowed)
+        self.assertFalse(lines[1].is_cancel_allowed)
+
+    def test_contract_line_state_cron(self):
+        line = self.acct_line.copy(
+            {
+                "date_start": self.today + relativedelta(days=10),
+                "recurring_next_date": self.today + relativedelta(days=10),
+                "date_end": self.today + relativedelta(months=2),
+                "is_auto_renew": False,
+            }
+        )
+        self.assertEqual(line.state, "upcoming")
+        line.flush_recordset()
+        with freeze_time(self.today + relativedelta(days=15)):
+            self.env.invalidate_all()
+            self.assertEqual(line.state, "upcoming")
+            self.env["contract.line"].cron_update_state()
+            self.assertEqual(line.state, "in-progress")
+            self.assertIn(
+                line, self.env["contract.line"].search([("state", "=", "in-progress")])
+            )
+        with freeze_time(self.today + relativedelta(months=3)):
+            self.env["contract.line"].cron_update_state()
+            self.assertEqual(line.state, "closed")
+
     def test_check_auto_renew_contract_line_with_successor(self):
         """
         A contract line with a successor can't be set to auto-renew
@@ -37,13 +37,17 @@ class ContractContract(models.Model):
         if self.mandate_id:
             invoice_vals["mandate_id"] = self.mandate_id.id
         elif self.payment_mode_id.payment_method_id.mandate_required:
-            mandate = self.env["account.banking.mandate"].search(
-                [
-                    ("partner_id", "=", self.partner_id.commercial_partner_id.id),
-                    ("state", "=", "valid"),
-                    ("company_id", "=", self.company_id.id),
-                ],
-                limit=1,
+            commercial_partner = self.partner_id.commercial_partner_id
+            mandate = self._get_invoice_resolution(
+                ("mandate", self.company_id.id, commercial_partner.id),
+                lambda: self.env["account.banking.mandate"].search(
+                    [
+                        ("partner_id", "=", commercial_partner.id),
+                        ("state", "=", "valid"),
+                        ("company_id", "=", self.company_id.id),
+                    ],
+                    limit=1,
+                ),
             )
             invoice_vals["mandate_id"] = mandate.id
         return invoice_vals
@@ -87,3 +87,20 @@ class TestContractMandate(TestContractBase):
         self.contract_with_mandate.mandate_id = False
         new_invoice = self.contract_with_mandate.recurring_create_invoice()
         self.assertFalse(new_invoice.mandate_id)
+
+    def test_contract_mandate_resolution(self):
+        self.contract_with_mandate.mandate_id = False
+        self.mandate.validate()
+        contracts = self.contract_with_mandate | self.contract_with_mandate.copy()
+        resolution = {}
+        invoices_values = contracts.with_context(
+            contract_invoice_resolution=resolution
+        )._prepare_recurring_invoices_values()
+        self.assertEqual(
+            [vals["mandate_id"] for vals in invoices_values],
+            [self.mandate.id, self.mandate.id],
+        )
+        self.assertIn(
+            ("mandate", self.contract_with_mandate.company_id.id, self.partner.id),
+            resolution,
+        )
@@ -9,24 +9,22 @@ class ContractLine(models.Model):
 
     @api.depends("contract_id.is_terminated")
     def _compute_allowed(self):
-        for rec in self:
-            rec.update(
-                {
-                    "is_plan_successor_allowed": False,
-                    "is_stop_plan_successor_allowed": False,
-                    "is_stop_allowed": False,
-                    "is_cancel_allowed": False,
-                    "is_un_cancel_allowed": False,
-                }
-            )
-            if rec.contract_id.is_terminated:
-                continue
-            else:
-                super(ContractLine, rec)._compute_allowed()
-        return True
+        return super()._compute_allowed()
+
+    def _get_allowed(self):
+        return [
+            False if line.contract_id.is_terminated else allowed
+            for line, allowed in zip(self, super()._get_allowed(), strict=True)
+        ]
 
     @api.model
     def _contract_line_to_renew_domain(self):
         return [
             ("contract_id.is_terminated", "=", False),
         ] + super()._contract_line_to_renew_domain()
+
+    @api.model
+    def _get_renewal_simulation_domain(self):
+        return [
+            ("contract_id.is_terminated", "=", False),
+        ] + super()._get_renewal_simulation_domain()